@@ -1,10 +1,12 @@
 from slack_sdk import WebClient
 
+from slack_housekeeper.ratelimit import RateLimitedClient
+
 # Set your Slack API token here
 slack_token = "xoxp-cośtam"
 
 # Initialize the Slack Web API client
-client = WebClient(token=slack_token)
+client = RateLimitedClient(WebClient(token=slack_token))
 
 
 def get_last_message(channel_id):
@@ -42,16 +44,21 @@ def get_all_channels_with_last_message():
     return all_channels_with_last_message
 
 
-channel_list_with_last_message = get_all_channels_with_last_message()
-for channel in channel_list_with_last_message:
-    print("Channel ID:", channel["id"])
-    print("Channel Name:", channel["name"])
-    print("Is Channel:", channel["is_channel"])
-    print("Is Member:", channel["is_member"])
+def main():
+    channel_list_with_last_message = get_all_channels_with_last_message()
+    for channel in channel_list_with_last_message:
+        print("Channel ID:", channel["id"])
+        print("Channel Name:", channel["name"])
+        print("Is Channel:", channel["is_channel"])
+        print("Is Member:", channel["is_member"])
+
+        last_message = channel.get("last_message")
+        if last_message:
+            print("Last Message Text:", last_message.get("text", "No messages"))
+            print("Last Message Timestamp:", last_message.get("ts"))
+
+        print("-" * 30)
 
-    last_message = channel.get("last_message")
-    if last_message:
-        print("Last Message Text:", last_message.get("text", "No messages"))
-        print("Last Message Timestamp:", last_message.get("ts"))
 
-    print("-" * 30)
+if __name__ == "__main__":
+    main()
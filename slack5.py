@@ -1,11 +1,13 @@
 from slack_sdk import WebClient
 from datetime import datetime, timedelta
 
+from slack_housekeeper.ratelimit import RateLimitedClient
+
 # Set your Slack API token here
 slack_token = "xoxp-cośtam"
 
 # Initialize the Slack Web API client
-client = WebClient(token=slack_token)
+client = RateLimitedClient(WebClient(token=slack_token))
 
 
 def get_channel_creator(channel_id):
@@ -115,34 +117,39 @@ def get_all_channels_with_last_message():
     return all_channels_with_last_message
 
 
-channel_list_with_last_message = get_all_channels_with_last_message()
-for channel in channel_list_with_last_message:
-    print("Channel ID:", channel["id"])
-    print("Channel Name:", channel["name"])
-    print("Is Channel:", channel["is_channel"])
-    print("Is Member:", channel["is_member"])
+def main():
+    channel_list_with_last_message = get_all_channels_with_last_message()
+    for channel in channel_list_with_last_message:
+        print("Channel ID:", channel["id"])
+        print("Channel Name:", channel["name"])
+        print("Is Channel:", channel["is_channel"])
+        print("Is Member:", channel["is_member"])
+
+        creator_id = channel.get("creator_id")
+        if creator_id:
+            print("Channel Creator ID:", creator_id)
+
+        last_message = channel.get("last_message")
+        if last_message:
+            print("Last Message Text:", last_message.get("text", "No messages"))
+            print("Last Message Timestamp:", last_message.get("ts"))
 
-    creator_id = channel.get("creator_id")
-    if creator_id:
-        print("Channel Creator ID:", creator_id)
+            last_message_time = convert_unix_timestamp_to_datetime(last_message.get("ts"))
+            print("Last Message Time:", last_message_time)
 
-    last_message = channel.get("last_message")
-    if last_message:
-        print("Last Message Text:", last_message.get("text", "No messages"))
-        print("Last Message Timestamp:", last_message.get("ts"))
+            time_duration = get_time_duration(last_message_time)
+            print("Time Duration since Last Message:", time_duration)
 
-        last_message_time = convert_unix_timestamp_to_datetime(last_message.get("ts"))
-        print("Last Message Time:", last_message_time)
+            if time_duration > timedelta(hours=2):
+                send_notification_to_creator(creator_id, channel["name"])
+                send_notification_to_housekeeping(channel["name"])
 
-        time_duration = get_time_duration(last_message_time)
-        print("Time Duration since Last Message:", time_duration)
+            if time_duration > timedelta(hours=24):
+                archive_channel(channel["id"])
+                send_archived_notification(channel["id"], channel["name"])
 
-        if time_duration > timedelta(hours=2):
-            send_notification_to_creator(creator_id, channel["name"])
-            send_notification_to_housekeeping(channel["name"])
+        print("-" * 30)
 
-        if time_duration > timedelta(hours=24):
-            archive_channel(channel["id"])
-            send_archived_notification(channel["id"], channel["name"])
 
-    print("-" * 30)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,24 +1,106 @@
+import os
+import time
 from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
 from datetime import datetime, timedelta
 
+from slack_housekeeper.archiver import ArchiveExecutor, format_results
+from slack_housekeeper.cache import ActivityCache
+from slack_housekeeper.checkpoint import SweepCheckpoint
+from slack_housekeeper.classifier import ARCHIVE, DECISIONS, WARN, classify_inactivity
+from slack_housekeeper.digest import HousekeepingDigest
+from slack_housekeeper.inventory import archived_at, build_inventory, paginate
+from slack_housekeeper.metrics import Metrics
+from slack_housekeeper.notices import CreatorNotices
+from slack_housekeeper.policy import Policy, channel_type, history_cutoff, load_policy
+from slack_housekeeper.prefilter import DEAD, PROBE, UNREADABLE, classify, last_update, prefilter
+from slack_housekeeper.ratelimit import RateLimitedClient, RequestScheduler
+from slack_housekeeper.scan import iter_scan, iter_scan_pages
+from slack_housekeeper.snapshot import RunSnapshot
+from slack_housekeeper.transport import PooledWebClient
+from slack_housekeeper.users import UserDirectory
+from slack_housekeeper.whitelist import Whitelist
+
 # Set your Slack API token here
 slack_token = "xoxp-costam"
 
+# Number of channels scanned at the same time (1 scans them one by one)
+scan_workers = 8
+
+# Channels archived at the same time (each one still gets its notice before it's archived)
+archive_workers = scan_workers
+
+# Keep-alive connections shared by the scanning workers (0 uses slack_sdk's WebClient instead)
+http_pool_size = scan_workers
+
+# Only changed to point the script at a local fake Slack (see slack_housekeeper.benchmark)
+slack_api_url = os.environ.get("SLACK_API_URL", "https://slack.com/api/")
+rate_limit_scale = float(os.environ.get("SLACK_RATE_LIMIT_SCALE", "1"))
+
+# API call counts, latencies and time spent in each phase, printed at the end of the run
+metrics = Metrics()
+
+# Also write them for node_exporter's textfile collector, e.g. "/var/lib/node_exporter/textfile/slack_housekeeper.prom"
+metrics_textfile = None
+
+# Save one row per channel (last activity, decision, API time) after every run, e.g. "snapshots",
+# to query months of runs with `python -m slack_housekeeper.snapshot` (Parquet needs pyarrow, JSON otherwise)
+snapshot_dir = None
+snapshot = None
+
+# One reference time for the whole run (set in main()), every channel's inactivity is measured against it.
+# Each page of channels is classified in one vectorised pass when numpy is installed (pip install numpy,
+# or the package's `fast` extra), otherwise channel by channel
+now = None
+
 # Initialize the Slack Web API client
-client = WebClient(token=slack_token)
+scheduler = RequestScheduler(scale=rate_limit_scale, metrics=metrics)
+if http_pool_size:
+    client = RateLimitedClient(PooledWebClient(slack_token, base_url=slack_api_url, pool_size=http_pool_size), scheduler)
+else:
+    client = RateLimitedClient(WebClient(token=slack_token, base_url=slack_api_url), scheduler)
+
+# Last activity seen in every channel, kept between runs (opened in main())
+activity_cache_path = "activity_cache.sqlite"
+activity_cache = None
+
+# How often this script runs, channels that can't become inactive before the next run aren't re-checked
+run_interval = timedelta(days=1)
+
+# Progress of the current sweep (channel list pages and what's been done to each channel),
+# so a run that crashes or gets killed picks up where it stopped next time (opened in main())
+checkpoint_path = "sweep_checkpoint.sqlite"
+checkpoint = None
 
-# Read whitelist from the whitelist.txt file
+# Collect #housekeeping notices and post them as one summary thread at the end of the run
+# (set to None to post every notice as its own message)
+housekeeping_digest = HousekeepingDigest(client, "#housekeeping")
 
+# Read whitelist from the whitelist.txt file (ids, names, prefixes like proj-* and re: patterns)
+whitelist_path = "whitelist.txt"
 
-def read_whitelist():
-    with open("whitelist.txt", "r") as f:
-        whitelist = f.read().splitlines()
-    return whitelist
+# Delete archived channels once they've been archived longer than the policy allows. Slack has no
+# conversations.delete, this goes through admin.conversations.delete, which needs an Enterprise Grid
+# org admin token with the admin.conversations:write scope (set SLACK_DELETE_ARCHIVED=1 or True here)
+delete_archived_channels = os.environ.get("SLACK_DELETE_ARCHIVED") == "1"
 
-whitelist = read_whitelist()
+# Warn/archive/delete thresholds per channel prefix, type and size, read in main() when the file exists
+# (the defaults are 21 days to warn, 30 to archive and 90 to delete archived channels)
+policy_path = "policy.toml"
+policy = Policy()
 
+# Users listed once per run interval, so creators who were deactivated, are bots or are guests aren't DMed;
+# their warnings go to the channel's last poster or, failing that, to fallback_admin (e.g. "U0123ADMIN")
+user_directory_path = "user_directory.sqlite"
+fallback_admin = None
 
-def get_channel_creator(channel_id):
+
+def get_channel_creator(channel):
+    # conversations_list already returns the creator, only ask for it when it's missing
+    if channel.get("creator"):
+        return channel["creator"]
+    
+    channel_id = channel["id"]
     response = client.conversations_info(channel=channel_id)
     
     if response["ok"]:
@@ -27,11 +109,14 @@ def get_channel_creator(channel_id):
         print(f"Error fetching channel info for channel {channel_id}: {response.get('error', 'Unknown error')}")
         return None
 
-def get_last_message(channel_id):
-    response = client.conversations_history(channel=channel_id, limit=1)
+def get_last_message(channel_id, oldest=None):
+    response = client.conversations_history(channel=channel_id, oldest=oldest, limit=1, include_all_metadata=False)
     
     if response["ok"] and response["messages"]:
         return response["messages"][0]
+    elif response["ok"]:
+        # Nothing posted since `oldest`
+        return None
     else:
         print(f"Error fetching last message for channel {channel_id}: {response.get('error', 'Unknown error')}")
         return None
@@ -39,30 +124,26 @@ def get_last_message(channel_id):
 def convert_unix_timestamp_to_datetime(unix_timestamp):
     return datetime.fromtimestamp(float(unix_timestamp))
 
-def get_time_duration(last_message_time):
-    current_time = datetime.now()
-    duration = current_time - last_message_time
-    return duration
-
 def format_time_remaining(delta):
     days = delta.days
     hours, remainder = divmod(delta.seconds, 3600)
     minutes, seconds = divmod(remainder, 60)
     return f"{days} days, {hours} hours"
 
-def send_notification_to_creator(creator_id, channel_name):
-    message = (
-        f"The channel #{channel_name} has been inactive for more than 21 days. "
-        "It will be autoarchived soon. If you wish to keep the channel active, please send a message."
-    )
-    
+def send_notification_to_creator(creator_id, message):
     response = client.chat_postMessage(channel=creator_id, text=message)
     if response["ok"]:
         print("Notification sent successfully to channel creator.")
+        return True
     else:
         print(f"Error sending notification to channel creator: {response.get('error', 'Unknown error')}")
+        return False
 
-def send_notification_to_housekeeping(channel_name, message):
+def send_notification_to_housekeeping(channel_name, message, kind="notice"):
+    if housekeeping_digest is not None:
+        housekeeping_digest.add(kind, channel_name, message)
+        return
+    
     housekeeping_channel = "#housekeeping"  # Replace with the actual name or ID of the channel
     
     full_message = f"Autoarchive Notice: {message} #{channel_name}"
@@ -81,98 +162,279 @@ def send_archived_notification(channel_id, channel_name):
     response = client.chat_postMessage(channel=channel_id, text=archive_notification)
     if response["ok"]:
         print("Archived notification sent successfully to channel.")
+        return True
     else:
         print(f"Error sending archived notification to channel: {response.get('error', 'Unknown error')}")
+        return False
 
 def archive_channel(channel_id):
     response = client.conversations_archive(channel=channel_id)
     if response["ok"]:
         print(f"Channel {channel_id} archived successfully.")
+        # Archived channels are deleted counting from this, not from when they were created
+        activity_cache.mark_archived(channel_id)
+        return True
     else:
         print(f"Error archiving channel {channel_id}: {response.get('error', 'Unknown error')}")
+        return False
 
-def remove_archived_channels():
-    response = client.conversations_list(types="public_channel,private_channel", exclude_archived=True)
-    
+# The two steps of a channel's archive workflow, run by the ArchiveExecutor in this order
+def notify_archived(channel):
+    with metrics.phase("notification"):
+        return send_archived_notification(channel["id"], channel["name"])
+
+def archive_and_mark(channel):
+    with metrics.phase("archive"):
+        archived = archive_channel(channel["id"])
+    if archived:
+        checkpoint.mark(channel["id"], "archive")
+        with metrics.phase("notification"):
+            send_notification_to_housekeeping(channel["name"], f"Channel {channel['name']} has been archived.", "archived")
+    return archived
+
+def remove_archived_channel(channel):
+    if checkpoint.done(channel["id"], "delete"):
+        return True
+    try:
+        response = client.admin_conversations_delete(channel_id=channel["id"])
+    except SlackApiError as e:
+        # One channel that can't be deleted mustn't stop the cleanup, or the inactivity sweep after it
+        error = e.response.get("error", "Unknown error")
+        if error == "channel_not_found":
+            # Deleted already, e.g. just before the previous run was interrupted
+            checkpoint.mark(channel["id"], "delete")
+            return True
+        if error == "method_not_supported":
+            print(f"Skipping removal of archived channel {channel['name']} (not supported on this plan).")
+        else:
+            print(f"Error removing archived channel {channel['name']}: {error}")
+        return False
     if response["ok"]:
-        channels = response["channels"]
-        for channel in channels:
-            if channel.get("is_archived") and datetime.now() - timedelta(days=90) > convert_unix_timestamp_to_datetime(channel.get("created")):
-                response = client.conversations_delete(channel=channel["id"])
-                if response["ok"]:
-                    print(f"Archived channel {channel['name']} removed successfully.")
-                    send_notification_to_housekeeping(channel["name"], f"Channel {channel['name']} has been removed.")
-                else:
-                    print(f"Error removing archived channel {channel['name']}: {response.get('error', 'Unknown error')}")
+        print(f"Archived channel {channel['name']} removed successfully.")
+        checkpoint.mark(channel["id"], "delete")
+        send_notification_to_housekeeping(channel["name"], f"Channel {channel['name']} has been removed.", "removed")
+        return True
     else:
-        print(f"Error fetching archived channels: {response.get('error', 'Unknown error')}")
+        print(f"Error removing archived channel {channel['name']}: {response.get('error', 'Unknown error')}")
+        return False
 
-def get_all_channels_with_last_message():
-    all_channels_with_last_message = []
-    cursor = None
+def record_snapshot(channel, decision, last_ts=None):
+    if snapshot is not None:
+        snapshot.add(channel, decision, last_ts, policy.thresholds(channel).archive_after, channel.get("api_seconds", 0.0))
+
+def remove_archived_channels(inventory):
+    started = time.monotonic()
+    examined = len(inventory.archived)
+    
+    if not delete_archived_channels:
+        print(f"Not removing any of the {examined} archived channels, delete_archived_channels is off.")
+        for channel in inventory.archived:
+            record_snapshot(channel, "archived")
+        return
+    
+    # Counted from when each channel was archived (None when that isn't known, those are kept)
+    archived = {channel["id"]: archived_at(channel, activity_cache) for channel in inventory.archived}
+    old_archived_channels = [
+        channel for channel in inventory.archived
+        if archived[channel["id"]] is not None
+        and inventory.taken_at - archived[channel["id"]] > policy.thresholds(channel).delete_archived_after.total_seconds()
+    ]
+    old_ids = {channel["id"] for channel in old_archived_channels}
+    for channel in inventory.archived:
+        if channel["id"] not in old_ids:
+            record_snapshot(channel, "archived")
+    # Bound so the deletes made by the workers count towards the caller's phase
+    removed = 0
+    # One channel that can't be removed only costs that channel (see remove_archived_channel)
+    for channel, result in zip(old_archived_channels, iter_scan(paginate(old_archived_channels), metrics.bind(remove_archived_channel), scan_workers)):
+        removed += result
+        record_snapshot(channel, "delete" if result else "archived")
+    
+    elapsed = max(time.monotonic() - started, 1e-6)
+    print(f"Examined {examined} archived channels ({examined / elapsed:.1f}/s), removed {removed} ({removed / elapsed:.2f}/s) in {elapsed:.1f}s, {len(old_archived_channels) - removed} could not be removed")
+
+def get_channel_with_last_message(channel):
+    channel_id = channel["id"]
+    api_seconds = metrics.thread_api_seconds()
+    with metrics.phase("channel_info"):
+        creator_id = get_channel_creator(channel)
+    
+    thresholds = policy.thresholds(channel)
+    cached_ts = activity_cache.last_ts_if_fresh(channel_id, thresholds.warn_after, run_interval)
+    if checkpoint.done(channel_id, "history"):
+        # Already checked by the run that was interrupted
+        last_message = checkpoint.result(channel_id, "history")
+    elif classify(channel, policy) == DEAD:
+        # No members left, the last change to the channel stands in for its last message
+        last_message = {"ts": str(last_update(channel)), "text": "(no members)"}
+    elif cached_ts:
+        last_message = {"ts": str(cached_ts), "text": "(recently active, not re-checked)"}
+    else:
+        # Only ask for messages newer than the history cutoff: a quiet channel answers with an empty list
+        # instead of its whole last message, and one call still tells warned from archived
+        cutoff = datetime.fromtimestamp(history_cutoff(thresholds, now))
+        with metrics.phase("history_fetching"):
+            last_message = get_last_message(channel_id, oldest=f"{cutoff.timestamp():.6f}")
+        activity_cache.update(
+            channel_id,
+            last_ts=float(last_message["ts"]) if last_message else None,
+            creator=creator_id,
+            created=channel.get("created"),
+        )
+        if not last_message and channel.get("created") and float(channel["created"]) > cutoff.timestamp():
+            last_message = {"ts": str(channel["created"]), "text": "(no messages since it was created)"}
+        elif not last_message and channel.get("created"):
+            # Quiet since the cutoff: its real last message is older, but how much older isn't looked up
+            last_message = {"ts": None, "quiet_since": f"{cutoff.timestamp():.6f}", "text": f"(no messages since {cutoff:%Y-%m-%d})"}
     
-    while True:
-        response = client.conversations_list(types="public_channel,private_channel", cursor=cursor)
+    if last_message:
+        # Keep only what the checks below use, not the blocks, attachments and files
+        last_message = {key: last_message[key] for key in ("ts", "quiet_since", "text", "user") if key in last_message}
+    checkpoint.mark(channel_id, "history", last_message)
+    
+    channel["creator_id"] = creator_id
+    channel["last_message"] = last_message
+    channel["api_seconds"] = metrics.thread_api_seconds() - api_seconds
+    return channel
+
+def skipped(channel, whitelist):
+    # Checked from the list data, before any call is made for the channel
+    if whitelist.matches(channel):
+        print(f"Channel {channel['name']} ({channel['id']}) is whitelisted. Skipping processing.")
+    elif policy.thresholds(channel).keep:
+        print(f"Channel {channel['name']} ({channel['id']}) is kept by policy. Skipping processing.")
+    else:
+        return False
+    record_snapshot(channel, "skip")
+    return True
+
+def iter_pages_with_last_message(inventory, whitelist):
+    # Sort channels out from the list data first: whitelisted and kept ones are left alone, empty ones
+    # need no history call, private ones we're not in can't be read, the rest are checked least recently changed first
+    groups = prefilter([channel for channel in inventory.active if not skipped(channel, whitelist)], policy)
+    print(f"{len(groups[DEAD])} empty channels, {len(groups[UNREADABLE])} unreadable private channels skipped, {len(groups[PROBE])} to check.")
+    # Pages are yielded as soon as all their channels are checked, the loop doesn't wait for the whole scan
+    yield from iter_scan_pages(paginate(groups[DEAD] + groups[PROBE]), get_channel_with_last_message, scan_workers)
+
+def main():
+    global activity_cache, checkpoint, policy, snapshot, now
+    activity_cache = ActivityCache(activity_cache_path)
+    checkpoint = SweepCheckpoint(checkpoint_path)
+    whitelist = Whitelist(whitelist_path)
+    # One DM per creator listing all their inactive channels, sent after the loop; the cache remembers
+    # who was warned, so nobody is warned again about a channel that's had no activity since
+    creator_notices = CreatorNotices(send_notification_to_creator, activity_cache)
+    users = UserDirectory(client, user_directory_path, ttl=run_interval)
+    # Archives run alongside the loop, archive_workers at a time
+    archiver = ArchiveExecutor(archive_and_mark, notify=notify_archived, workers=archive_workers)
+    if os.path.exists(policy_path):
+        policy = load_policy(policy_path)
+    if snapshot_dir:
+        snapshot = RunSnapshot()
+
+    # Resume the last sweep if it didn't finish, unless it's from before the previous scheduled run
+    checkpoint.begin(run_interval)
+
+    # List every channel once, both phases below work from this snapshot
+    with metrics.phase("channel_listing"):
+        inventory = build_inventory(client, checkpoint=checkpoint)
+    print(f"Found {len(inventory.active)} active and {len(inventory.archived)} archived channels.")
+
+    # Remove archived channels older than the policy allows (90 days by default)
+    with metrics.phase("clean_old_archived"):
+        remove_archived_channels(inventory)
+
+    now = time.time()
+
+    # Process and send notifications for other channels
+    for page in iter_pages_with_last_message(inventory, whitelist):
+        # Inactivity, decision and time left before archiving for the whole page in one pass
+        # (whitelisted and kept channels were skipped before their history was fetched)
+        warn_after, archive_after, _ = policy.threshold_columns(
+            [channel["name"] for channel in page], [channel_type(channel) for channel in page],
+            [channel.get("num_members") for channel in page],
+        )
+        # Channels quiet since the cutoff count from the cutoff, the least inactivity they can have had
+        last_ts = [float(channel["last_message"]["ts"] or channel["last_message"]["quiet_since"]) if channel.get("last_message") else None for channel in page]
+        created = [channel.get("created") for channel in page]
+        inactive, decisions, remaining = classify_inactivity(last_ts, created, warn_after, archive_after, now)
+        # Nothing posted since the history cutoff is past the archive threshold, even right at the cutoff
+        decisions = [ARCHIVE if channel.get("last_message") and channel["last_message"]["ts"] is None else decision
+                     for channel, decision in zip(page, decisions)]
+
+        for channel, inactive_seconds, decision, remaining_seconds in zip(page, inactive, decisions, remaining):
+            print("Channel ID:", channel["id"])
+            print("Channel Name:", channel["name"])
+            print("Is Channel:", channel["is_channel"])
+            print("Is Member:", channel["is_member"])
         
-        if response["ok"]:
-            channels = response["channels"]
-            for channel in channels:
-                channel_id = channel["id"]
-                creator_id = get_channel_creator(channel_id)
-                last_message = get_last_message(channel_id)
-                
-                channel["creator_id"] = creator_id
-                channel["last_message"] = last_message
-                all_channels_with_last_message.append(channel)
+            creator_id = channel.get("creator_id")
+            if creator_id:
+                print("Channel Creator ID:", creator_id)
             
-            cursor = response.get("response_metadata", {}).get("next_cursor")
+            last_message = channel.get("last_message")
+            if last_message:
+                # No ts when the channel has been quiet since the cutoff, time_duration is then a lower bound
+                exact = last_message.get("ts") is not None
+                print("Last Message Text:", last_message.get("text", "No messages"))
+                print("Last Message Timestamp:", last_message.get("ts"))
             
-            if not cursor:
-                break
-        else:
-            print("Error fetching channel list:", response["error"])
-            break
+                if exact:
+                    last_message_time = convert_unix_timestamp_to_datetime(last_message.get("ts"))
+                    print("Last Message Time:", last_message_time)
             
-    return all_channels_with_last_message
-
-# Remove archived channels older than 90 days
-remove_archived_channels()
-
-# Process and send notifications for other channels
-channel_list_with_last_message = get_all_channels_with_last_message()
-for channel in channel_list_with_last_message:
-    print("Channel ID:", channel["id"])
-    print("Channel Name:", channel["name"])
-    print("Is Channel:", channel["is_channel"])
-    print("Is Member:", channel["is_member"])
-
-    if channel["id"] in whitelist:
-        print("Channel is whitelisted. Skipping processing.")
-        print("-" * 30)
-        continue
-    
-    creator_id = channel.get("creator_id")
-    if creator_id:
-        print("Channel Creator ID:", creator_id)
-        
-    last_message = channel.get("last_message")
-    if last_message:
-        print("Last Message Text:", last_message.get("text", "No messages"))
-        print("Last Message Timestamp:", last_message.get("ts"))
-        
-        last_message_time = convert_unix_timestamp_to_datetime(last_message.get("ts"))
-        print("Last Message Time:", last_message_time)
-        
-        time_duration = get_time_duration(last_message_time)
-        print("Time Duration since Last Message:", time_duration)
-        
-        if time_duration > timedelta(days=21):
-            send_notification_to_creator(creator_id, channel["name"])
-            send_notification_to_housekeeping(channel["name"], f"Channel {channel['name']} is inactive. It will be autoarchived in {format_time_remaining(timedelta(days=30) - time_duration)}.")
+                time_duration = timedelta(seconds=float(inactive_seconds))
+                time_remaining = timedelta(seconds=float(remaining_seconds))
+                print("Time Duration since Last Message:", time_duration if exact else f"more than {time_duration}")
+            
+                if decision in (WARN, ARCHIVE):
+                    recipient = users.recipient(creator_id, last_message.get("user"), fallback_admin)
+                    if recipient != creator_id:
+                        print(f"Creator {creator_id} can't be notified, warning {recipient or 'nobody'} instead.")
+                    if recipient:
+                        creator_notices.add(recipient, channel, float(last_message["ts"] or last_message["quiet_since"]), time_remaining, exact=exact)
+                    with metrics.phase("notification"):
+                        send_notification_to_housekeeping(channel["name"], f"Channel {channel['name']} is inactive. It will be autoarchived in {format_time_remaining(time_remaining)}.", "inactive")
+            
+                if decision == ARCHIVE:
+                    if checkpoint.done(channel["id"], "archive"):
+                        # Archived before an interruption, the digest wasn't posted so the entry goes back in
+                        send_notification_to_housekeeping(channel["name"], f"Channel {channel['name']} has been archived.", "archived")
+                    else:
+                        archiver.submit(channel)
         
-        if time_duration > timedelta(days=30):
-            archive_channel(channel["id"])
-            send_archived_notification(channel["id"], channel["name"])
-            send_notification_to_housekeeping(channel["name"], f"Channel {channel['name']} has been archived.")
-    
-    print("-" * 30)
\ No newline at end of file
+            record_snapshot(channel, DECISIONS[decision] if last_message else "none", last_message["ts"] if last_message else None)
+            print("-" * 30)
+
+    archive_results = archiver.results()
+    if archive_results:
+        print("\n".join(format_results(archive_results)))
+        archived = sum(result["archived"] for result in archive_results)
+        print(f"Archived {archived} of {len(archive_results)} channels.")
+
+    with metrics.phase("notification"):
+        warned = creator_notices.flush()
+    print(f"Inactivity warnings sent to {warned} channel creators.")
+
+    # Post everything collected for #housekeeping in one go
+    if housekeeping_digest is not None:
+        with metrics.phase("notification"):
+            messages = housekeeping_digest.flush()
+        print(f"Housekeeping digest posted in {messages} messages.")
+
+    # Everything's done, the next run starts a new sweep (unless listing the channels failed part way)
+    if checkpoint.listed:
+        checkpoint.finish()
+
+    if snapshot is not None:
+        print(f"Snapshot of {len(snapshot)} channels saved to {snapshot.save(snapshot_dir)}")
+
+    # Where the run spent its time
+    for line in metrics.summary():
+        print(line)
+    if metrics_textfile:
+        metrics.write_textfile(metrics_textfile)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
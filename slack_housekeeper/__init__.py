@@ -0,0 +1 @@
+"""Shared building blocks for the Slack housekeeping scripts."""
@@ -0,0 +1,47 @@
+"""Response and error types that behave like slack_sdk's, for code that doesn't go through WebClient."""
+import sys
+
+
+class ApiResponse(dict):
+    """A Slack API response body with the HTTP status code and headers attached,
+    like slack_sdk's SlackResponse."""
+
+    def __init__(self, data, status_code=200, headers=None):
+        super().__init__(data)
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    @property
+    def data(self):
+        return self
+
+
+class ApiError(Exception):
+    """Stand-in for slack_sdk.errors.SlackApiError when slack_sdk isn't installed."""
+
+    def __init__(self, message, response):
+        super().__init__(message)
+        self.response = response
+
+
+def api_error(response):
+    """Builds the exception WebClient would raise for a failed response.
+
+    That's a real SlackApiError whenever slack_sdk has been imported, so the
+    scripts' `except SlackApiError` blocks handle it as usual. Code that
+    never imported slack_sdk gets an ApiError and slack_sdk stays unloaded.
+    """
+    message = f"The request to the Slack API failed.\nThe server responded with: {dict(response)}"
+    errors = sys.modules.get("slack_sdk.errors")
+    if errors is None:
+        return ApiError(message, response)
+    return errors.SlackApiError(message, response)
+
+
+def api_errors():
+    """Everything a failed API call can raise, for `except api_errors()` in code
+    that works with both WebClient and PooledWebClient."""
+    errors = sys.modules.get("slack_sdk.errors")
+    if errors is None:
+        return (ApiError,)
+    return (ApiError, errors.SlackApiError)
@@ -0,0 +1,74 @@
+"""Archiving many channels at once, while each channel's own steps still happen in order."""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+RESULT_FIELDS = ("channel_id", "channel_name", "notified", "archived", "error")
+
+
+def _error(e):
+    response = getattr(e, "response", None)
+    if response is not None and hasattr(response, "get") and response.get("error"):
+        return response["error"]
+    return str(e) or type(e).__name__
+
+
+class ArchiveExecutor:
+    """Runs the archive workflow of every submitted channel on `workers` threads.
+
+    A channel's workflow runs on a single thread: `notify(channel)` posts the
+    notice into the channel, then `archive(channel)` archives it (archived
+    channels can't be posted to). Both return whether they succeeded. A failed
+    notice doesn't stop the archive. The request scheduler behind the client
+    keeps all the threads within the rate limits.
+
+    results() waits for everything submitted and returns one row per channel,
+    in submission order.
+    """
+
+    def __init__(self, archive, notify=None, workers=8):
+        self.archive = archive
+        self.notify = notify
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers))
+        self._futures = []
+        self._lock = threading.Lock()
+
+    def _run(self, channel):
+        result = dict.fromkeys(RESULT_FIELDS)
+        result.update(channel_id=channel["id"], channel_name=channel.get("name"))
+        try:
+            if self.notify is not None:
+                try:
+                    result["notified"] = bool(self.notify(channel))
+                except Exception as e:
+                    result["notified"] = False
+                    result["error"] = f"notice: {_error(e)}"
+            result["archived"] = bool(self.archive(channel))
+        except Exception as e:
+            # Steps that return False have reported their failure themselves
+            result["archived"] = False
+            result["error"] = _error(e)
+            logger.error(f"Failed to archive channel {result['channel_name']} ({result['channel_id']}): {result['error']}")
+        return result
+
+    def submit(self, channel):
+        with self._lock:
+            self._futures.append(self._pool.submit(self._run, channel))
+
+    def results(self):
+        with self._lock:
+            futures, self._futures = self._futures, []
+        results = [future.result() for future in futures]
+        self._pool.shutdown()
+        return results
+
+
+def format_results(results):
+    """The rows of results() as a text table, one line per channel."""
+    rows = [list(RESULT_FIELDS)]
+    for result in results:
+        rows.append(["" if result[field] is None else str(result[field]) for field in RESULT_FIELDS])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(RESULT_FIELDS))]
+    return ["  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip() for row in rows]
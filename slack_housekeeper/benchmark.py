@@ -0,0 +1,165 @@
+"""Benchmarks run against a local fake Slack server, no real workspace needed.
+
+    python -m slack_housekeeper.benchmark transport --requests 2000 --workers 8
+    python -m slack_housekeeper.benchmark pipeline --channels 1000 10000 --latency 0.02
+
+`pipeline` runs each housekeeping script end to end against a synthetic
+workspace and reports wall time, API calls per channel, peak RSS and the
+p50/p99 latency of the calls as seen by the server.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from slack_housekeeper.fakeslack import FakeSlack, FakeSlackServer
+from slack_housekeeper.transport import PooledWebClient
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Pipeline variants: script to run and the extra environment it runs with
+PIPELINES = {
+    "slack9": ("slack9.py", {}),
+    "newgen": ("SlackBotNewGen", {}),
+    "newgen-sequential": ("SlackBotNewGen", {"SLACK_SCAN_WORKERS": "1", "SLACK_HTTP_POOL": "1"}),
+}
+
+
+def _transport_clients(url, workers):
+    yield "new connection per request", PooledWebClient("xoxp-bench", base_url=url, pool_size=workers, keep_alive=False)
+    yield "keep-alive pool", PooledWebClient("xoxp-bench", base_url=url, pool_size=workers)
+    try:
+        from slack_sdk import WebClient
+    except ImportError:
+        return
+    yield "slack_sdk WebClient", WebClient(token="xoxp-bench", base_url=url)
+
+
+def bench_transport(requests=2000, workers=8, latency=0.0):
+    """Requests per second of conversations_history calls with and without connection pooling."""
+    slack = FakeSlack()
+    slack.add_channel("C0000001", "general", last_message_ts=time.time())
+    server = FakeSlackServer(slack, latency=latency).start()
+
+    results = []
+    try:
+        for name, client in _transport_clients(server.url, workers):
+            connections = server.connections
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(lambda _, client=client: client.conversations_history(channel="C0000001", limit=1),
+                              range(requests)))
+            elapsed = time.perf_counter() - started
+            results.append({
+                "variant": name,
+                "requests": requests,
+                "seconds": elapsed,
+                "requests_per_second": requests / elapsed,
+                "connections": server.connections - connections,
+            })
+            if hasattr(client, "close"):
+                client.close()
+    finally:
+        server.stop()
+    return results
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def bench_pipeline(variant, channels, latency=0.0, rate_scale=1000.0, seed=0):
+    """Runs one pipeline variant as a subprocess against a fresh synthetic workspace."""
+    script, extra_env = PIPELINES[variant]
+    slack = FakeSlack.synthetic(channels, seed=seed, enforce_limits=True, limit_scale=rate_scale)
+    server = FakeSlackServer(slack, latency=latency).start()
+
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(filter(None, [REPO_DIR, os.environ.get("PYTHONPATH")])),
+        "SLACK_API_TOKEN": "xoxp-bench",
+        "SLACK_API_URL": server.url,
+        "SLACK_RATE_LIMIT_SCALE": str(rate_scale),
+        # The fake workspace takes any token for admin.conversations.delete
+        "SLACK_DELETE_ARCHIVED": "1",
+        **extra_env,
+    }
+    try:
+        with tempfile.TemporaryDirectory() as workdir, open(os.path.join(workdir, "stderr.log"), "w+") as stderr:
+            started = time.perf_counter()
+            process = subprocess.Popen(
+                [sys.executable, os.path.join(REPO_DIR, script)],
+                cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=stderr,
+            )
+            # wait4 gives this child's own resource usage, including its peak RSS
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            elapsed = time.perf_counter() - started
+            if process.returncode:
+                stderr.seek(0)
+                print(f"{variant} exited with {process.returncode}:\n{stderr.read()[-2000:]}", file=sys.stderr)
+    finally:
+        server.stop()
+
+    latencies = [seconds for values in server.latencies.values() for seconds in values]
+    return {
+        "variant": variant,
+        "channels": channels,
+        "exit_code": process.returncode,
+        "wall_seconds": elapsed,
+        "api_calls": sum(slack.calls.values()),
+        "calls_per_channel": sum(slack.calls.values()) / channels,
+        "ratelimited": sum(slack.ratelimited.values()),
+        "peak_rss_mb": usage.ru_maxrss / 1024,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def print_table(results):
+    columns = list(results[0])
+    rows = [[f"{row[column]:.2f}" if isinstance(row[column], float) else str(row[column]) for column in columns]
+            for row in results]
+    widths = [max(len(column), *(len(row[i]) for row in rows)) for i, column in enumerate(columns)]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    transport = commands.add_parser("transport", help="compare requests/s with and without connection pooling")
+    transport.add_argument("--requests", type=int, default=2000)
+    transport.add_argument("--workers", type=int, default=8)
+    transport.add_argument("--latency", type=float, default=0.0, help="seconds the server waits before answering")
+
+    pipeline = commands.add_parser("pipeline", help="run the housekeeping scripts end to end")
+    pipeline.add_argument("--channels", type=int, nargs="+", default=[1000],
+                          help="synthetic workspace sizes, e.g. 1000 10000 100000")
+    pipeline.add_argument("--variants", nargs="+", choices=sorted(PIPELINES), default=sorted(PIPELINES))
+    pipeline.add_argument("--latency", type=float, default=0.0, help="seconds the server waits before answering")
+    pipeline.add_argument("--rate-scale", type=float, default=1000.0,
+                          help="multiplier for the tier rate limits on both sides (default: 1000)")
+    pipeline.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args(argv)
+    if args.command == "transport":
+        print_table(bench_transport(args.requests, args.workers, args.latency))
+    elif args.command == "pipeline":
+        print_table([
+            bench_pipeline(variant, channels, args.latency, args.rate_scale, args.seed)
+            for channels in args.channels
+            for variant in args.variants
+        ])
+
+
+if __name__ == "__main__":
+    main()
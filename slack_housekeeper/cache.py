@@ -0,0 +1,93 @@
+"""On-disk cache of the last activity seen in every channel, kept between runs."""
+import sqlite3
+import threading
+import time
+
+
+class ActivityCache:
+    """SQLite table of channel id -> last message ts, creator, created and when it was last checked.
+
+    A cached `last_ts` is never newer than the channel's real last activity,
+    so a channel whose cached activity is recent enough can safely skip its
+    conversations_history call until it could reach the warning threshold.
+
+    It also keeps the ledger of inactivity warnings sent (see CreatorNotices),
+    and when each channel the housekeeper archived was archived.
+    """
+
+    def __init__(self, path):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS channels ("
+                "id TEXT PRIMARY KEY, last_ts REAL, creator TEXT, created REAL, checked_at REAL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS warnings (channel_id TEXT PRIMARY KEY, creator TEXT, warned_at REAL)"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS archives (channel_id TEXT PRIMARY KEY, archived_at REAL)")
+
+    def get(self, channel_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT last_ts, creator, created, checked_at FROM channels WHERE id = ?", (channel_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"last_ts": row[0], "creator": row[1], "created": row[2], "checked_at": row[3]}
+
+    def update(self, channel_id, last_ts=None, creator=None, created=None, checked_at=None):
+        # Missing values keep whatever was cached before
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO channels (id, last_ts, creator, created, checked_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET "
+                "last_ts = MAX(COALESCE(excluded.last_ts, last_ts), COALESCE(last_ts, excluded.last_ts)), "
+                "creator = COALESCE(excluded.creator, creator), "
+                "created = COALESCE(excluded.created, created), "
+                "checked_at = excluded.checked_at",
+                (channel_id, last_ts, creator, created, checked_at or time.time()),
+            )
+
+    def last_ts_if_fresh(self, channel_id, warn_after, run_interval, now=None):
+        """The cached last activity, if the channel can't go `warn_after` without
+        activity before the next run (`run_interval` from now). Otherwise None."""
+        entry = self.get(channel_id)
+        if entry is None or entry["last_ts"] is None:
+            return None
+        now = time.time() if now is None else now
+        inactive_at_next_run = now - entry["last_ts"] + run_interval.total_seconds()
+        if inactive_at_next_run < warn_after.total_seconds():
+            return entry["last_ts"]
+        return None
+
+    def warned_at(self, channel_id):
+        with self._lock:
+            row = self._db.execute("SELECT warned_at FROM warnings WHERE channel_id = ?", (channel_id,)).fetchone()
+        return row[0] if row else None
+
+    def mark_warned(self, channel_id, creator, warned_at=None):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO warnings (channel_id, creator, warned_at) VALUES (?, ?, ?)",
+                (channel_id, creator, warned_at or time.time()),
+            )
+
+    def archived_at(self, channel_id):
+        with self._lock:
+            row = self._db.execute("SELECT archived_at FROM archives WHERE channel_id = ?", (channel_id,)).fetchone()
+        return row[0] if row else None
+
+    def mark_archived(self, channel_id, archived_at=None):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO archives (channel_id, archived_at) VALUES (?, ?)",
+                (channel_id, archived_at or time.time()),
+            )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
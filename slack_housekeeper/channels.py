@@ -0,0 +1,25 @@
+"""Helpers for walking the workspace's channel list."""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def iter_channel_pages(client, **kwargs):
+    """Yields conversations_list pages one at a time, following the cursor until the last one."""
+    for channels, _ in iter_cursor_pages(client, **kwargs):
+        yield channels
+
+
+def iter_cursor_pages(client, cursor=None, **kwargs):
+    """Like iter_channel_pages, but yields (channels, next_cursor) and can start from a saved cursor."""
+    while True:
+        response = client.conversations_list(cursor=cursor, **kwargs)
+        if not response["ok"]:
+            logger.error(f"Error fetching channel list: {response.get('error', 'Unknown error')}")
+            return
+
+        cursor = response.get("response_metadata", {}).get("next_cursor")
+        yield response["channels"], cursor
+
+        if not cursor:
+            return
@@ -0,0 +1,116 @@
+"""Durable progress of a sweep, so a crashed or stalled run resumes where it stopped.
+
+The checkpoint keeps every conversations_list page fetched so far with the
+cursor of the next one, and which stages ("history", "archive", "delete")
+each channel has completed, with the stage's result. A new run
+resumes an unfinished sweep younger than `max_age` and starts over
+otherwise. finish() clears it once a sweep has gone all the way through.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from slack_housekeeper.channels import iter_cursor_pages
+
+logger = logging.getLogger(__name__)
+
+
+class SweepCheckpoint:
+
+    def __init__(self, path):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS sweep (key TEXT PRIMARY KEY, value TEXT)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS pages (seq INTEGER PRIMARY KEY, channels TEXT)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS stages ("
+                "channel_id TEXT, stage TEXT, result TEXT, done_at REAL, PRIMARY KEY (channel_id, stage))"
+            )
+
+    def _get(self, key):
+        row = self._db.execute("SELECT value FROM sweep WHERE key = ?", (key,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def _set(self, key, value):
+        self._db.execute("INSERT OR REPLACE INTO sweep (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def _clear(self):
+        for table in ("sweep", "pages", "stages"):
+            self._db.execute(f"DELETE FROM {table}")
+
+    def begin(self, max_age, now=None):
+        """Resumes the stored sweep if it's unfinished and younger than `max_age` (a timedelta),
+        otherwise starts a new one. Returns True when resuming."""
+        now = time.time() if now is None else now
+        with self._lock, self._db:
+            started_at = self._get("started_at")
+            if started_at is not None and now - started_at < max_age.total_seconds():
+                done = self._db.execute("SELECT COUNT(*) FROM stages").fetchone()[0]
+                logger.info(f"Resuming sweep started at {time.ctime(started_at)} ({done} channel stages already done)")
+                return True
+            self._clear()
+            self._set("started_at", now)
+            return False
+
+    def finish(self):
+        with self._lock, self._db:
+            self._clear()
+
+    @property
+    def listed(self):
+        """Whether the whole channel list has been fetched."""
+        with self._lock:
+            return bool(self._get("listed"))
+
+    def iter_pages(self, client, **kwargs):
+        """Yields the stored channel list pages, then fetches the rest from the saved cursor."""
+        with self._lock:
+            rows = self._db.execute("SELECT seq, channels FROM pages ORDER BY seq").fetchall()
+            cursor = self._get("cursor")
+            listed = self._get("listed")
+        for _, channels in rows:
+            yield json.loads(channels)
+        if listed or (rows and not cursor):
+            return
+
+        seq = rows[-1][0] + 1 if rows else 0
+        for channels, next_cursor in iter_cursor_pages(client, cursor=cursor, **kwargs):
+            # The page and the cursor after it are saved together, so a resume neither skips nor repeats a page
+            with self._lock, self._db:
+                self._db.execute("INSERT INTO pages (seq, channels) VALUES (?, ?)", (seq, json.dumps(channels)))
+                self._set("cursor", next_cursor)
+                if not next_cursor:
+                    self._set("listed", True)
+            seq += 1
+            yield channels
+
+    def done(self, channel_id, stage):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM stages WHERE channel_id = ? AND stage = ?", (channel_id, stage)
+            ).fetchone()
+        return row is not None
+
+    def result(self, channel_id, stage, default=None):
+        """What mark() stored for a completed stage, or `default` if it isn't done."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT result FROM stages WHERE channel_id = ? AND stage = ?", (channel_id, stage)
+            ).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def mark(self, channel_id, stage, result=None):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO stages (channel_id, stage, result, done_at) VALUES (?, ?, ?, ?)",
+                (channel_id, stage, json.dumps(result), time.time()),
+            )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,146 @@
+"""The `slack-housekeeper` command: one workspace, configured from environment variables.
+
+    SLACK_API_TOKEN             bot or user token (required)
+    SLACK_APP_TOKEN             app-level token, for --listen
+    SLACK_SCAN_WORKERS          channels processed at the same time (default 8, 1 = one by one)
+    SLACK_HTTP_POOL             keep-alive connections (default: one per worker, 0 = slack_sdk's WebClient)
+    SLACK_HTTP2                 1 to multiplex requests over HTTP/2 (needs httpx)
+    SLACK_ACTIVITY_CACHE        last activity cache (default activity_cache.sqlite)
+    SLACK_CHECKPOINT            sweep checkpoint (default sweep_checkpoint.sqlite, empty disables)
+    SLACK_RUN_INTERVAL_HOURS    how often the sweep runs (default 24)
+    SLACK_HOUSEKEEPING_DIGEST   0 to post every #housekeeping notice on its own
+    SLACK_POLICY                thresholds per channel prefix, type and size (.toml or .yaml, see policy.py)
+    SLACK_USER_CACHE            users.list snapshot (default user_directory.sqlite)
+    SLACK_DELETE_ARCHIVED       1 to delete archived channels past their threshold (needs an org admin
+                                token, the delete goes through admin.conversations.delete)
+    SLACK_FALLBACK_ADMIN        user warned when neither the creator nor the last poster can be
+    SLACK_SNAPSHOT_DIR          save one row per channel there after every sweep (see snapshot.py)
+    SLACK_SNAPSHOT_FORMAT       parquet (default), arrow or json (parquet and arrow need pyarrow)
+    SLACK_METRICS_TEXTFILE      Prometheus textfile written after every sweep
+    SLACK_METRICS_PORT          serve /metrics on this port
+    SLACK_API_URL, SLACK_RATE_LIMIT_SCALE   only for testing against a fake Slack
+
+Many workspaces at once: slack-housekeeper-fleet (see slack_housekeeper.fleet).
+"""
+import argparse
+import logging
+import os
+from datetime import timedelta
+
+from slack_housekeeper.events import fake_workspace
+from slack_housekeeper.housekeeper import Housekeeper
+from slack_housekeeper.plan import Plan
+from slack_housekeeper.policy import load_policy
+
+logger = logging.getLogger(__name__)
+
+
+def housekeeper_from_env(environ=os.environ):
+    token = environ.get("SLACK_API_TOKEN")
+    if not token:
+        raise ValueError("SLACK_API_TOKEN environment variable not set")
+
+    return Housekeeper(
+        token,
+        api_url=environ.get("SLACK_API_URL", "https://slack.com/api/"),
+        rate_limit_scale=float(environ.get("SLACK_RATE_LIMIT_SCALE", "1")),
+        scan_workers=int(environ.get("SLACK_SCAN_WORKERS", "8")),
+        http_pool_size=int(environ["SLACK_HTTP_POOL"]) if environ.get("SLACK_HTTP_POOL") else None,
+        http2=environ.get("SLACK_HTTP2") == "1",
+        activity_cache_path=environ.get("SLACK_ACTIVITY_CACHE", "activity_cache.sqlite"),
+        checkpoint_path=environ.get("SLACK_CHECKPOINT", "sweep_checkpoint.sqlite"),
+        run_interval=timedelta(hours=float(environ.get("SLACK_RUN_INTERVAL_HOURS", "24"))),
+        digest=environ.get("SLACK_HOUSEKEEPING_DIGEST", "1") != "0",
+        whitelist_path="whitelist.txt",
+        metrics_textfile=environ.get("SLACK_METRICS_TEXTFILE"),
+        policy=load_policy(environ["SLACK_POLICY"]) if environ.get("SLACK_POLICY") else None,
+        user_cache_path=environ.get("SLACK_USER_CACHE", "user_directory.sqlite"),
+        fallback_admin=environ.get("SLACK_FALLBACK_ADMIN"),
+        delete_archived=environ.get("SLACK_DELETE_ARCHIVED") == "1",
+        snapshot_dir=environ.get("SLACK_SNAPSHOT_DIR"),
+        snapshot_format=environ.get("SLACK_SNAPSHOT_FORMAT", "parquet"),
+    )
+
+
+def replay(path, environ=os.environ):
+    if environ.get("SLACK_API_TOKEN"):
+        logger.error("--replay never talks to Slack, unset SLACK_API_TOKEN to run it")
+        return 2
+
+    # Throwaway caches, so recorded timestamps and warnings don't leak into the real ones
+    housekeeper = Housekeeper(
+        name="replay",
+        client=fake_workspace(path),
+        rate_limit_scale=1000,
+        activity_cache_path=":memory:",
+        user_cache_path=":memory:",
+        whitelist_path="whitelist.txt",
+        policy=load_policy(environ["SLACK_POLICY"]) if environ.get("SLACK_POLICY") else None,
+    )
+    try:
+        housekeeper.replay(path)
+    finally:
+        housekeeper.close()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Archive and clean up inactive Slack channels")
+    parser.add_argument("--listen", action="store_true",
+                        help="keep running and track activity from Socket Mode events (needs SLACK_APP_TOKEN)")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="sweep recorded events (JSON lines) against a fake workspace, never Slack "
+                             "(refuses to run with SLACK_API_TOKEN set)")
+    parser.add_argument("--sweep-interval", type=float, default=3600,
+                        help="seconds between inactivity checks in --listen mode (default: 3600)")
+    parser.add_argument("--plan", metavar="FILE",
+                        help="only work out what would be warned, archived and deleted and save it (.json or .parquet)")
+    parser.add_argument("--execute", metavar="FILE",
+                        help="apply a plan saved by --plan")
+    return parser
+
+
+def main(argv=None, environ=os.environ):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler("channel_cleanup.log"),
+            logging.StreamHandler()
+        ]
+    )
+
+    if args.replay:
+        return replay(args.replay, environ)
+
+    try:
+        housekeeper = housekeeper_from_env(environ)
+    except ValueError as e:
+        logger.error(str(e))
+        return 2
+
+    metrics_port = int(environ.get("SLACK_METRICS_PORT", "0"))
+    if metrics_port:
+        housekeeper.metrics.serve(metrics_port)
+
+    try:
+        if args.listen:
+            app_token = environ.get("SLACK_APP_TOKEN")
+            if not app_token:
+                logger.error("SLACK_APP_TOKEN environment variable not set")
+                return 2
+            housekeeper.listen(app_token, args.sweep_interval)
+        elif args.execute:
+            housekeeper.apply_plan(Plan.load(args.execute))
+        elif args.plan:
+            housekeeper.plan(args.plan)
+        else:
+            housekeeper.run()
+    finally:
+        housekeeper.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,81 @@
+"""Batched #housekeeping notifications: one summary per run instead of one message per channel."""
+import threading
+from collections import Counter
+
+# Block Kit limit for a section's text, and how many full sections keep a
+# message under Slack's 40k character limit
+SECTION_CHARS = 3000
+MESSAGE_BLOCKS = 12
+
+
+class HousekeepingDigest:
+    """Collects the run's housekeeping events and posts them together in flush().
+
+    The summary goes out as one parent message with the per-channel details
+    split into as few Block Kit messages as fit, posted as thread replies
+    (or as follow-up messages when `threaded` is False).
+    """
+
+    def __init__(self, client, channel="#housekeeping", threaded=True):
+        self.client = client
+        self.channel = channel
+        self.threaded = threaded
+        self._events = []
+        self._lock = threading.Lock()
+
+    def add(self, kind, channel_name, text):
+        with self._lock:
+            self._events.append((kind, channel_name, text))
+
+    def __len__(self):
+        return len(self._events)
+
+    def _summary_blocks(self, counts):
+        totals = " · ".join(f"*{count}* {kind}" for kind, count in counts.items())
+        return [
+            {"type": "header", "text": {"type": "plain_text", "text": "Housekeeping summary"}},
+            {"type": "section", "text": {"type": "mrkdwn", "text": totals}},
+        ]
+
+    def _detail_messages(self, events):
+        sections = []
+        text = ""
+        for kind, channel_name, line in events:
+            entry = f"• *{kind}* #{channel_name}: {line}\n"
+            if len(text) + len(entry) > SECTION_CHARS:
+                sections.append(text)
+                text = ""
+            text += entry[:SECTION_CHARS]
+        if text:
+            sections.append(text)
+
+        blocks = [{"type": "section", "text": {"type": "mrkdwn", "text": section}} for section in sections]
+        return [blocks[start:start + MESSAGE_BLOCKS] for start in range(0, len(blocks), MESSAGE_BLOCKS)]
+
+    def flush(self):
+        """Posts everything collected so far and returns the number of messages sent."""
+        with self._lock:
+            events, self._events = self._events, []
+        if not events:
+            return 0
+
+        events.sort(key=lambda event: event[0])
+        counts = Counter(kind for kind, _, _ in events)
+        summary = ", ".join(f"{count} {kind}" for kind, count in counts.items())
+
+        response = self.client.chat_postMessage(
+            channel=self.channel,
+            text=f"Autoarchive Notice: {summary}",
+            blocks=self._summary_blocks(counts),
+        )
+        thread_ts = response["ts"] if self.threaded else None
+
+        details = self._detail_messages(events)
+        for number, blocks in enumerate(details, start=1):
+            self.client.chat_postMessage(
+                channel=self.channel,
+                thread_ts=thread_ts,
+                text=f"Autoarchive details ({number}/{len(details)})",
+                blocks=blocks,
+            )
+        return 1 + len(details)
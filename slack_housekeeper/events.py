@@ -0,0 +1,182 @@
+"""Event-driven bookkeeping of channel activity.
+
+Instead of polling conversations_history for every channel, the long-running
+mode keeps an ActivityIndex up to date from Events API events (message.channels,
+message.groups, channel_created, channel_archive, channel_unarchive) and only
+runs the archive checks over the index on a timer. Events come either from
+Socket Mode or, for local testing, from a JSON lines file via replay_events().
+A replay runs against fake_workspace(), a FakeSlack holding the recorded
+channels, so the warnings and archives it decides on never reach Slack.
+"""
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityIndex:
+    """Last activity per channel, updated from events and flushed to an ActivityCache."""
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self._channels = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def add(self, channel, last_ts=None):
+        with self._lock:
+            self._channels[channel["id"]] = {
+                "id": channel["id"],
+                "name": channel.get("name"),
+                "creator": channel.get("creator"),
+                "created": float(channel.get("created") or time.time()),
+                "is_archived": bool(channel.get("is_archived")),
+                # What a Policy looks at besides the name
+                "is_private": bool(channel.get("is_private")),
+                "is_ext_shared": bool(channel.get("is_ext_shared")),
+                "num_members": channel.get("num_members"),
+                "last_ts": float(last_ts) if last_ts else None,
+                "warned_for": None,
+            }
+            self._dirty.add(channel["id"])
+
+    def get(self, channel_id):
+        with self._lock:
+            entry = self._channels.get(channel_id)
+            return dict(entry) if entry else None
+
+    def __len__(self):
+        return len(self._channels)
+
+    def touch(self, channel_id, ts):
+        with self._lock:
+            entry = self._channels.get(channel_id)
+            if entry is None:
+                # Not seen at startup (e.g. a private channel we just got invited to)
+                entry = self._channels[channel_id] = {
+                    "id": channel_id, "name": None, "creator": None, "created": float(ts),
+                    "is_archived": False, "last_ts": None, "warned_for": None,
+                }
+            if entry["last_ts"] is None or float(ts) > entry["last_ts"]:
+                entry["last_ts"] = float(ts)
+                self._dirty.add(channel_id)
+
+    def set_archived(self, channel_id, archived=True):
+        with self._lock:
+            if channel_id in self._channels:
+                self._channels[channel_id]["is_archived"] = archived
+
+    def mark_warned(self, channel_id):
+        """Remember the warning was sent for the channel's current last activity."""
+        with self._lock:
+            entry = self._channels[channel_id]
+            entry["warned_for"] = entry["last_ts"] or entry["created"]
+
+    def apply(self, event):
+        kind = event.get("type")
+        if kind == "message" and event.get("channel"):
+            self.touch(event["channel"], event.get("event_ts") or event["ts"])
+        elif kind in ("channel_created", "group_created"):
+            self.add(event["channel"])
+        elif kind in ("channel_archive", "group_archive"):
+            self.set_archived(event["channel"], True)
+        elif kind in ("channel_unarchive", "group_unarchive"):
+            self.set_archived(event["channel"], False)
+            # Unarchiving counts as activity, the channel starts a fresh inactivity period
+            self.touch(event["channel"], event.get("event_ts") or time.time())
+        else:
+            return False
+        return True
+
+    def inactive(self, older_than, now=None):
+        """Yields (channel, inactivity) for unarchived channels idle for longer than `older_than`."""
+        now = time.time() if now is None else now
+        with self._lock:
+            entries = [dict(entry) for entry in self._channels.values() if not entry["is_archived"]]
+        for entry in entries:
+            last_activity = entry["last_ts"] or entry["created"]
+            inactivity = now - last_activity
+            if inactivity > older_than.total_seconds():
+                yield entry, inactivity
+
+    def flush(self):
+        """Writes the channels whose activity changed since the last flush to the cache."""
+        if self.cache is None:
+            return 0
+        with self._lock:
+            dirty = [self._channels[channel_id] for channel_id in self._dirty if channel_id in self._channels]
+            self._dirty.clear()
+        for entry in dirty:
+            self.cache.update(entry["id"], last_ts=entry["last_ts"], creator=entry["creator"], created=entry["created"])
+        return len(dirty)
+
+
+def iter_events(lines):
+    """Parses JSON lines holding either bare events or Events API envelopes ({"event": {...}})."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        payload = json.loads(line)
+        yield payload.get("event", payload)
+
+
+def replay_events(path, index):
+    """Feeds a recorded event stream into the index, standing in for a live Slack connection."""
+    applied = 0
+    with open(path, "r") as f:
+        for event in iter_events(f):
+            applied += index.apply(event)
+    logger.info(f"Replayed {applied} events from {path}")
+    return applied
+
+
+def fake_workspace(path):
+    """A FakeSlack with the channels, messages and archive state of a recorded event stream."""
+    from slack_housekeeper.fakeslack import FakeSlack
+
+    slack = FakeSlack()
+    with open(path, "r") as f:
+        for event in iter_events(f):
+            kind = event.get("type")
+            if kind in ("channel_created", "group_created"):
+                channel = event["channel"]
+                if channel["id"] not in slack.channels:
+                    slack.add_channel(
+                        channel["id"], channel.get("name") or channel["id"], creator=channel.get("creator"),
+                        created=channel.get("created"), is_private=kind == "group_created",
+                    )
+            elif kind == "message" and event.get("channel"):
+                ts = float(event.get("event_ts") or event["ts"])
+                if event["channel"] not in slack.channels:
+                    # Only known from its messages, so nobody to warn about it
+                    slack.add_channel(event["channel"], event["channel"], creator=None, created=ts)
+                slack.add_message(event["channel"], ts, text=event.get("text", ""), user=event.get("user"))
+            elif kind in ("channel_archive", "group_archive", "channel_unarchive", "group_unarchive"):
+                if event["channel"] in slack.channels:
+                    slack.channels[event["channel"]]["is_archived"] = kind.endswith("_archive")
+    return slack
+
+
+def run_socket_mode(app_token, index, on_tick, interval):
+    """Applies events from Socket Mode to the index and calls `on_tick` every `interval` seconds."""
+    from slack_sdk.socket_mode import SocketModeClient
+    from slack_sdk.socket_mode.response import SocketModeResponse
+
+    def handle(client, request):
+        client.send_socket_mode_response(SocketModeResponse(envelope_id=request.envelope_id))
+        if request.type == "events_api":
+            index.apply(request.payload.get("event", {}))
+
+    socket_client = SocketModeClient(app_token=app_token)
+    socket_client.socket_mode_request_listeners.append(handle)
+    socket_client.connect()
+    logger.info("Listening for channel events over Socket Mode")
+    try:
+        while True:
+            time.sleep(interval)
+            on_tick()
+    finally:
+        socket_client.close()
@@ -0,0 +1,393 @@
+"""In-process stand-in for the Slack Web API.
+
+FakeSlack implements the WebClient methods the housekeeper calls on top of an
+in-memory workspace and can answer with HTTP 429 on demand, so the request
+scheduler and the scripts' logic can be exercised without a real token:
+
+    slack = FakeSlack()
+    slack.add_channel("C1", "general", last_message_ts=time.time() - 40 * 86400)
+    slack.inject_ratelimit("conversations_history", times=2, retry_after=1)
+    client = RateLimitedClient(slack)
+
+FakeSlackServer puts the same workspace behind a local HTTP server for
+anything that talks to Slack over the network. It can also be started on
+its own with a synthetic workspace:
+
+    python -m slack_housekeeper.fakeslack --channels 10000 --port 8000 --latency 0.05
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from slack_housekeeper.api import ApiResponse, api_error
+from slack_housekeeper.ratelimit import DEFAULT_TIER, METHOD_TIERS, TIER_LIMITS
+
+
+DAY = 86400
+
+
+class FakeSlack:
+    # Never talks to Slack, which is what Housekeeper.replay() checks for
+    offline = True
+
+    def __init__(self, page_size=1000, enforce_limits=False, limit_scale=1.0, clock=time.monotonic):
+        self.channels = {}
+        self.messages = {}
+        self.users = {}
+        self.posted = []
+        self.calls = Counter()
+        self.ratelimited = Counter()
+        self.page_size = page_size
+        # Answer 429 whenever a method goes over its tier limit, like Slack does
+        self.enforce_limits = enforce_limits
+        self.limit_scale = limit_scale
+        self._injected = {}
+        self._recent = {}
+        self._clock = clock
+        self._lock = threading.RLock()
+
+    @classmethod
+    def synthetic(cls, channels, seed=0, now=None, **kwargs):
+        """A workspace of `channels` channels with a realistic mix of activity.
+
+        Roughly 5% are archived, and of the rest about half are active, 15%
+        are between the 21 and 30 day thresholds, 25% are past 30 days and
+        10% have never had a message. Of the 500 channel creators about 5%
+        have been deactivated, 2% are bots and 3% are guests.
+        """
+        rng = random.Random(seed)
+        now = time.time() if now is None else now
+        slack = cls(**kwargs)
+        for i in range(channels):
+            created = now - rng.uniform(1, 400) * DAY
+            kind = rng.random()
+            if kind < 0.05:
+                last_message_ts = None
+            elif kind < 0.50:
+                last_message_ts = now - rng.uniform(0, 21) * DAY
+            elif kind < 0.65:
+                last_message_ts = now - rng.uniform(21, 30) * DAY
+            elif kind < 0.90:
+                last_message_ts = now - rng.uniform(30, 400) * DAY
+            else:
+                last_message_ts = None
+            slack.add_channel(
+                f"C{i:09d}",
+                f"channel-{i}",
+                creator=f"U{rng.randrange(500):04d}",
+                created=min(created, last_message_ts or created),
+                is_private=rng.random() < 0.2,
+                is_archived=kind < 0.05,
+                num_members=0 if rng.random() < 0.05 else rng.randint(1, 200),
+                last_message_ts=last_message_ts,
+            )
+        for i in range(500):
+            kind = rng.random()
+            slack.add_user(f"U{i:04d}", deleted=kind < 0.05, is_bot=0.05 <= kind < 0.07, is_restricted=0.07 <= kind < 0.10)
+        return slack
+
+    def add_channel(self, channel_id, name, creator="U0000", created=None, is_private=False,
+                    is_archived=False, num_members=1, last_message_ts=None, **fields):
+        created = time.time() - 365 * 86400 if created is None else created
+        self.channels[channel_id] = {
+            "id": channel_id,
+            "name": name,
+            "is_channel": not is_private,
+            "is_group": False,
+            "is_private": is_private,
+            "is_archived": is_archived,
+            "is_member": True,
+            "is_ext_shared": False,
+            "creator": creator,
+            "created": int(created),
+            "updated": int(created * 1000),
+            "num_members": num_members,
+            **fields,
+        }
+        self.messages[channel_id] = []
+        if last_message_ts is not None:
+            self.add_message(channel_id, last_message_ts)
+        return self.channels[channel_id]
+
+    def add_user(self, user_id, name=None, deleted=False, is_bot=False, is_restricted=False, **fields):
+        self.users[user_id] = {
+            "id": user_id,
+            "name": name or user_id.lower(),
+            "deleted": deleted,
+            "is_bot": is_bot,
+            "is_restricted": is_restricted,
+            "is_ultra_restricted": False,
+            **fields,
+        }
+        return self.users[user_id]
+
+    def add_message(self, channel_id, ts, text="Hello", user="U0000"):
+        message = {"type": "message", "user": user, "text": text, "ts": f"{float(ts):.6f}"}
+        self.messages[channel_id].append(message)
+        self.messages[channel_id].sort(key=lambda m: float(m["ts"]))
+        return message
+
+    def inject_ratelimit(self, method, times=1, retry_after=1):
+        """Make the next `times` calls of `method` fail with 429 and the given Retry-After."""
+        with self._lock:
+            self._injected.setdefault(method, []).extend([retry_after] * times)
+
+    def _over_limit(self, method):
+        limit = TIER_LIMITS[METHOD_TIERS.get(method, DEFAULT_TIER)] * self.limit_scale
+        window = self._recent.setdefault(method, deque())
+        now = self._clock()
+        while window and window[0] <= now - 60:
+            window.popleft()
+        if len(window) >= limit:
+            return max(1, int(window[0] + 60 - now) + 1)
+        window.append(now)
+        return None
+
+    def _call(self, method):
+        with self._lock:
+            self.calls[method] += 1
+            if self._injected.get(method):
+                delay = self._injected[method].pop(0)
+            elif self.enforce_limits:
+                delay = self._over_limit(method)
+            else:
+                delay = None
+            if delay is None:
+                return
+            self.ratelimited[method] += 1
+        raise api_error(ApiResponse(
+            {"ok": False, "error": "ratelimited"}, status_code=429, headers={"Retry-After": str(delay)}
+        ))
+
+    def _ok(self, **data):
+        return ApiResponse({"ok": True, **data})
+
+    def _fail(self, error):
+        return api_error(ApiResponse({"ok": False, "error": error}))
+
+    def _channel(self, channel_id):
+        if channel_id not in self.channels:
+            raise self._fail("channel_not_found")
+        return self.channels[channel_id]
+
+    def conversations_list(self, types="public_channel", cursor=None, limit=100, exclude_archived=False, **kwargs):
+        self._call("conversations_list")
+        wanted = set(types.split(","))
+        with self._lock:
+            channels = [
+                c for c in self.channels.values()
+                if ("private_channel" if c["is_private"] else "public_channel") in wanted
+                and not (exclude_archived and c["is_archived"])
+            ]
+        offset = int(cursor.split(":")[1]) if cursor else 0
+        end = offset + min(limit, self.page_size)
+        next_cursor = f"offset:{end}" if end < len(channels) else ""
+        return self._ok(
+            channels=[dict(c) for c in channels[offset:end]],
+            response_metadata={"next_cursor": next_cursor},
+        )
+
+    def conversations_info(self, channel, **kwargs):
+        self._call("conversations_info")
+        return self._ok(channel=dict(self._channel(channel)))
+
+    def conversations_history(self, channel, limit=100, oldest=None, latest=None, inclusive=False, **kwargs):
+        self._call("conversations_history")
+        self._channel(channel)
+        with self._lock:
+            messages = list(reversed(self.messages[channel]))
+        if oldest is not None:
+            messages = [m for m in messages if float(m["ts"]) > float(oldest) or (inclusive and float(m["ts"]) == float(oldest))]
+        if latest is not None:
+            messages = [m for m in messages if float(m["ts"]) < float(latest) or (inclusive and float(m["ts"]) == float(latest))]
+        return self._ok(messages=[dict(m) for m in messages[:limit]], has_more=len(messages) > limit)
+
+    def conversations_archive(self, channel, **kwargs):
+        self._call("conversations_archive")
+        with self._lock:
+            info = self._channel(channel)
+            if info["is_archived"]:
+                raise self._fail("already_archived")
+            info["is_archived"] = True
+            info["updated"] = int(time.time() * 1000)
+        return self._ok()
+
+    def admin_conversations_delete(self, channel_id, **kwargs):
+        self._call("admin_conversations_delete")
+        with self._lock:
+            self._channel(channel_id)
+            del self.channels[channel_id]
+            del self.messages[channel_id]
+        return self._ok()
+
+    def users_list(self, cursor=None, limit=100, **kwargs):
+        self._call("users_list")
+        with self._lock:
+            users = list(self.users.values())
+        offset = int(cursor.split(":")[1]) if cursor else 0
+        end = offset + min(limit, self.page_size)
+        next_cursor = f"offset:{end}" if end < len(users) else ""
+        return self._ok(members=[dict(u) for u in users[offset:end]], response_metadata={"next_cursor": next_cursor})
+
+    def chat_postMessage(self, channel, text=None, blocks=None, thread_ts=None, **kwargs):
+        self._call("chat_postMessage")
+        user = self.users.get(channel)
+        if user is not None and user["deleted"]:
+            raise self._fail("channel_not_found")
+        if user is not None and user["is_bot"]:
+            raise self._fail("cannot_dm_bot")
+        ts = f"{time.time():.6f}"
+        with self._lock:
+            # Only messages Slack would have accepted end up in `posted`
+            if channel in self.channels and self.channels[channel]["is_archived"]:
+                raise self._fail("is_archived")
+            if user is None and not channel.startswith("#") and channel not in self.channels:
+                raise self._fail("channel_not_found")
+            self.posted.append({"channel": channel, "text": text, "blocks": blocks, "thread_ts": thread_ts, "ts": ts})
+            if channel in self.channels:
+                self.add_message(channel, ts, text=text or "", user="UHOUSEKEEPER")
+        return self._ok(channel=channel, ts=ts)
+
+
+def _form_value(value):
+    if value in ("true", "false"):
+        return value == "true"
+    if value.isdigit():
+        return int(value)
+    if value[:1] in ("[", "{"):
+        # blocks, attachments and other JSON encoded arguments
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return value
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.count_connection()
+
+    def _params(self):
+        query = urlsplit(self.path).query
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode() if length else ""
+        return {key: _form_value(value) for key, value in parse_qsl(query) + parse_qsl(body)}
+
+    def _handle(self):
+        started = time.perf_counter()
+        method = urlsplit(self.path).path.rsplit("/", 1)[-1]
+        status, headers, payload = self.server.dispatch(method, self._params())
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        self.server.record(method, time.perf_counter() - started)
+
+    do_GET = _handle
+    do_POST = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeSlackServer(ThreadingHTTPServer):
+    """Serves a FakeSlack over HTTP/1.1 with keep-alive, so real HTTP clients can be pointed at it.
+
+        server = FakeSlackServer(slack, latency=0.05).start()
+        client = WebClient(token="xoxp-test", base_url=server.url)
+    """
+
+    daemon_threads = True
+
+    def __init__(self, slack=None, host="127.0.0.1", port=0, latency=0.0, jitter=0.0):
+        super().__init__((host, port), _Handler)
+        self.slack = slack or FakeSlack()
+        # Every call waits `latency` seconds plus up to `jitter` more, like a real round trip
+        self.latency = latency
+        self.jitter = jitter
+        self.connections = 0
+        self.latencies = defaultdict(list)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/"
+
+    def count_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def record(self, method, seconds):
+        with self._lock:
+            self.latencies[method].append(seconds)
+
+    def dispatch(self, method, params):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+        handler = getattr(self.slack, method.replace(".", "_"), None)
+        if "." not in method or handler is None:
+            return 200, {}, {"ok": False, "error": "unknown_method"}
+        try:
+            response = handler(**params)
+        except Exception as e:
+            response = getattr(e, "response", None)
+            if response is None:
+                raise
+        return response.status_code, response.headers, dict(response)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a fake Slack Web API with a synthetic workspace")
+    parser.add_argument("--channels", type=int, default=1000)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra seconds per call")
+    parser.add_argument("--rate-scale", type=float, default=None,
+                        help="enforce the tier rate limits, multiplied by this factor")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    slack = FakeSlack.synthetic(
+        args.channels,
+        seed=args.seed,
+        enforce_limits=args.rate_scale is not None,
+        limit_scale=args.rate_scale or 1.0,
+    )
+    server = FakeSlackServer(slack, args.host, args.port, args.latency, args.jitter)
+    print(f"Fake Slack with {args.channels} channels listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {sum(slack.calls.values())} calls: {dict(slack.calls)}")
+
+
+if __name__ == "__main__":
+    main()
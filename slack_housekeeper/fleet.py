@@ -0,0 +1,147 @@
+"""Housekeeping for many workspaces from one process, e.g. every workspace of an Enterprise Grid org.
+
+Workspaces are listed in a TOML file:
+
+    [defaults]
+    scan_workers = 4
+    state_dir = "/var/lib/slack-housekeeper"
+    snapshot_dir = "/var/lib/slack-housekeeper/snapshots"   # one subdirectory per workspace
+
+    [[workspace]]
+    name = "engineering"
+    token_env = "SLACK_TOKEN_ENGINEERING"
+
+    [[workspace]]
+    name = "sales"
+    token_env = "SLACK_ORG_TOKEN"   # one org token for several workspaces,
+    team_id = "T0123SALES"          # told apart by team_id
+    whitelist = "sales-whitelist.txt"
+    policy = "sales-policy.toml"    # see slack_housekeeper.policy
+    fallback_admin = "U0123ADMIN"   # warned when the creator and last poster can't be
+    delete_archived = true          # needs an org admin token (admin.conversations.delete)
+
+Every workspace gets its own Housekeeper, and with it its own rate limit
+budget, activity cache, checkpoint and metrics. Up to `--concurrency` of them
+are swept at the same time, and a combined table is printed at the end.
+
+    python -m slack_housekeeper.fleet fleet.toml --concurrency 8
+"""
+import argparse
+import logging
+import os
+import time
+import tomllib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from slack_housekeeper.housekeeper import Housekeeper
+from slack_housekeeper.policy import load_policy
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FIELDS = ("channels", "deleted", "delete_failed", "warned", "warn_skipped", "archived", "api_calls", "seconds")
+
+
+def load_fleet(path):
+    """Reads the fleet file and returns the Housekeeper keyword arguments of every workspace."""
+    with open(path, "rb") as f:
+        config = tomllib.load(f)
+
+    defaults = config.get("defaults", {})
+    policies = {}
+    workspaces = []
+    for entry in config.get("workspace", []):
+        settings = {**defaults, **entry}
+        name = settings["name"]
+        state_dir = settings.get("state_dir", ".")
+
+        token = settings.get("token")
+        if not token and settings.get("token_env"):
+            token = os.environ.get(settings["token_env"])
+        if not token:
+            raise ValueError(f"No token for workspace {name}, set token or token_env")
+
+        metrics_dir = settings.get("metrics_dir")
+        snapshot_dir = settings.get("snapshot_dir")
+        policy_path = settings.get("policy")
+        # Workspaces sharing a policy file share the compiled policy
+        if policy_path and policy_path not in policies:
+            policies[policy_path] = load_policy(policy_path)
+        workspaces.append({
+            "token": token,
+            "name": name,
+            "team_id": settings.get("team_id"),
+            "api_url": settings.get("api_url", "https://slack.com/api/"),
+            "scan_workers": settings.get("scan_workers", 8),
+            "http_pool_size": settings.get("http_pool_size"),
+            "http2": settings.get("http2", False),
+            "rate_limit_scale": settings.get("rate_limit_scale", 1.0),
+            "activity_cache_path": os.path.join(state_dir, f"{name}.activity_cache.sqlite"),
+            "checkpoint_path": os.path.join(state_dir, f"{name}.checkpoint.sqlite"),
+            "user_cache_path": os.path.join(state_dir, f"{name}.users.sqlite"),
+            "run_interval": timedelta(hours=settings.get("run_interval_hours", 24)),
+            "digest": settings.get("digest", True),
+            "whitelist_path": settings.get("whitelist", "whitelist.txt"),
+            "metrics_textfile": os.path.join(metrics_dir, f"slack_housekeeper_{name}.prom") if metrics_dir else None,
+            "policy": policies.get(policy_path),
+            "fallback_admin": settings.get("fallback_admin"),
+            "delete_archived": settings.get("delete_archived", False),
+            "snapshot_dir": os.path.join(snapshot_dir, name) if snapshot_dir else None,
+            "snapshot_format": settings.get("snapshot_format", "parquet"),
+        })
+    return workspaces
+
+
+def sweep_workspace(settings, plan_dir=None):
+    housekeeper = None
+    try:
+        # A workspace that can't even be set up is reported like any other failed sweep
+        housekeeper = Housekeeper(**settings)
+        if plan_dir:
+            plan = housekeeper.plan(os.path.join(plan_dir, f"{settings['name']}.plan.json"))
+            return {"workspace": settings["name"], **plan.counts()}
+        return housekeeper.run()
+    except Exception as e:
+        logger.exception(f"Sweep of workspace {settings['name']} failed")
+        return {"workspace": settings["name"], "error": str(e) or type(e).__name__}
+    finally:
+        if housekeeper is not None:
+            housekeeper.close()
+
+
+def run_fleet(workspaces, concurrency=4, plan_dir=None):
+    """Sweeps every workspace, `concurrency` at a time, and returns their summaries in config order."""
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        return list(pool.map(lambda settings: sweep_workspace(settings, plan_dir), workspaces))
+
+
+def print_summary(results, fields=SUMMARY_FIELDS):
+    rows = [["workspace", *fields, "error"]]
+    for result in results:
+        rows.append([str(result.get("workspace")), *(str(result.get(field, "")) for field in fields), result.get("error", "")])
+    rows.append(["total", *(str(sum(result.get(field) or 0 for result in results)) for field in fields), ""])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    for row in rows:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the channel cleanup for every workspace in a fleet file")
+    parser.add_argument("config", help="TOML file listing the workspaces")
+    parser.add_argument("--concurrency", type=int, default=4, help="workspaces swept at the same time (default: 4)")
+    parser.add_argument("--plan-dir", metavar="DIR",
+                        help="only save a plan per workspace to DIR instead of acting (see SlackBotNewGen --plan)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    workspaces = load_fleet(args.config)
+    started = time.monotonic()
+    results = run_fleet(workspaces, args.concurrency, args.plan_dir)
+    logger.info(f"Swept {len(workspaces)} workspaces in {time.monotonic() - started:.1f}s")
+
+    print_summary(results, ("warn", "archive", "delete") if args.plan_dir else SUMMARY_FIELDS)
+    return 1 if any("error" in result for result in results) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
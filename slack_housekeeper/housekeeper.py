@@ -0,0 +1,778 @@
+"""The housekeeping pipeline for one workspace: delete old archived channels, warn and archive inactive ones.
+
+Everything a run needs (client, rate limit scheduler, caches, digest, whitelist
+and metrics) belongs to its Housekeeper, so several workspaces can be swept
+side by side in one process (see slack_housekeeper.fleet).
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from slack_housekeeper.api import api_errors
+from slack_housekeeper.archiver import ArchiveExecutor
+from slack_housekeeper.cache import ActivityCache
+from slack_housekeeper.checkpoint import SweepCheckpoint
+from slack_housekeeper.digest import HousekeepingDigest
+from slack_housekeeper.events import ActivityIndex, replay_events, run_socket_mode
+from slack_housekeeper.inventory import archived_at, build_inventory, paginate
+from slack_housekeeper.metrics import Metrics
+from slack_housekeeper.notices import CreatorNotices
+from slack_housekeeper.plan import Plan, execute_plan
+from slack_housekeeper.policy import Policy, history_cutoff
+from slack_housekeeper.prefilter import DEAD, PROBE, UNREADABLE, classify, last_update, prefilter
+from slack_housekeeper.ratelimit import RateLimitedClient, RequestScheduler
+from slack_housekeeper.scan import iter_scan
+from slack_housekeeper.snapshot import RunSnapshot
+from slack_housekeeper.transport import DEFAULT_BASE_URL, PooledWebClient
+from slack_housekeeper.users import UserDirectory
+from slack_housekeeper.whitelist import Whitelist
+
+logger = logging.getLogger(__name__)
+
+# Fields we need from conversations_list, usually already in the response
+CHANNEL_FIELDS = ("creator", "created", "is_archived", "name")
+
+
+class _WorkspaceLog(logging.LoggerAdapter):
+    def process(self, msg, kwargs):
+        return f"[{self.extra['workspace']}] {msg}", kwargs
+
+
+class Housekeeper:
+    """Sweeps one workspace.
+
+    `http_pool_size` keep-alive connections are shared by `scan_workers`
+    threads (0 uses slack_sdk's WebClient instead). Pass `client` to use an
+    already built client, e.g. a FakeSlack. `checkpoint_path` makes run()
+    resumable, `metrics_textfile` is rewritten at the end of every run.
+    `policy` sets the thresholds (21/30/90 days for every channel by default).
+    Warnings for creators who can't be sent a DM (deactivated, bots or
+    guests, looked up in a users.list snapshot at `user_cache_path`) go to
+    the channel's last poster instead, or to `fallback_admin`. With a
+    `snapshot_dir`, every run() also saves one row per channel there (see
+    slack_housekeeper.snapshot).
+
+    Archived channels past their delete threshold are only deleted with
+    `delete_archived`: Slack has no conversations.delete, the housekeeper
+    calls admin.conversations.delete, which needs an Enterprise Grid org
+    admin token with the admin.conversations:write scope.
+
+    Creating a Housekeeper has no side effects: the client (and slack_sdk,
+    if it's used), the activity cache, the user directory, the digest, the
+    creator notices and the whitelist are only set up the first time they're
+    needed.
+    """
+
+    def __init__(self, token=None, name=None, api_url=DEFAULT_BASE_URL, team_id=None, scan_workers=8,
+                 http_pool_size=None, http2=False, rate_limit_scale=1.0,
+                 activity_cache_path="activity_cache.sqlite", checkpoint_path=None,
+                 run_interval=timedelta(hours=24), digest=True, whitelist_path="whitelist.txt",
+                 metrics_textfile=None, policy=None, user_cache_path="user_directory.sqlite", fallback_admin=None,
+                 snapshot_dir=None, snapshot_format="parquet", delete_archived=False, client=None):
+        self.name = name
+        self.team_id = team_id
+        self.scan_workers = scan_workers
+        self.run_interval = run_interval
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint = None
+        self.metrics_textfile = metrics_textfile
+        self.policy = policy or Policy()
+        self.fallback_admin = fallback_admin
+        self.snapshot_dir = snapshot_dir
+        self.snapshot_format = snapshot_format
+        self.snapshot = None
+        self.delete_archived = delete_archived
+        # The time every channel's inactivity is measured against, set once by each run(), plan(),
+        # apply_plan() and sweep, so all channels of a sweep are judged at the same moment
+        self.now = None
+        self.log = _WorkspaceLog(logger, {"workspace": name}) if name else logger
+
+        self.metrics = Metrics(labels={"workspace": name} if name else None)
+        self.scheduler = RequestScheduler(scale=rate_limit_scale, metrics=self.metrics)
+        self._client_settings = (token, api_url, http_pool_size, http2)
+        self._given_client = client
+        self._client = None
+        self._activity_cache_path = activity_cache_path
+        self._activity_cache = None
+        self._user_cache_path = user_cache_path
+        self._users = None
+        # Last poster seen in each channel this run, warned instead of a creator who can't be
+        self._last_posters = {}
+        # Archives of the current process_channels(), run apart from the scan (see ArchiveExecutor)
+        self._archiver = None
+        self.archive_results = []
+        self._digest_enabled = digest
+        self._digest = None
+        self._notices = None
+        self._whitelist_path = whitelist_path
+        self._whitelist = None
+        self._lock = threading.Lock()
+
+    def _build_client(self):
+        if self._given_client is not None:
+            return self._given_client
+        token, api_url, http_pool_size, http2 = self._client_settings
+        if not token:
+            raise ValueError(f"No Slack API token for workspace {self.name or '(default)'}")
+        pool_size = self.scan_workers if http_pool_size is None else http_pool_size
+        if pool_size:
+            return PooledWebClient(token, base_url=api_url, pool_size=pool_size, http2=http2)
+        from slack_sdk import WebClient
+
+        return WebClient(token=token, base_url=api_url)
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = RateLimitedClient(self._build_client(), self.scheduler)
+        return self._client
+
+    @property
+    def activity_cache(self):
+        if self._activity_cache is None:
+            with self._lock:
+                if self._activity_cache is None:
+                    self._activity_cache = ActivityCache(self._activity_cache_path)
+        return self._activity_cache
+
+    @property
+    def user_directory(self):
+        if self._users is None:
+            client = self.client
+            with self._lock:
+                if self._users is None:
+                    self._users = UserDirectory(client, self._user_cache_path, ttl=self.run_interval,
+                                                team_id=self.team_id)
+        return self._users
+
+    @property
+    def housekeeping_digest(self):
+        if self._digest_enabled and self._digest is None:
+            client = self.client
+            with self._lock:
+                if self._digest is None:
+                    self._digest = HousekeepingDigest(client, "#housekeeping")
+        return self._digest
+
+    @property
+    def whitelist(self):
+        if self._whitelist is None:
+            with self._lock:
+                if self._whitelist is None:
+                    self._whitelist = Whitelist(self._whitelist_path)
+        return self._whitelist
+
+    @property
+    def creator_notices(self):
+        if self._notices is None:
+            ledger = self.activity_cache
+            with self._lock:
+                if self._notices is None:
+                    self._notices = CreatorNotices(self.send_notification, ledger)
+        return self._notices
+
+    def close(self):
+        if self._client is not None:
+            close = getattr(self._client._client, "close", None)
+            if close is not None:
+                close()
+        if self._activity_cache is not None:
+            self._activity_cache.close()
+        if self._users is not None:
+            self._users.close()
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+
+    def get_channel_info(self, channel):
+        if all(channel.get(field) is not None for field in CHANNEL_FIELDS):
+            return channel
+
+        try:
+            with self.metrics.phase("channel_info"):
+                response = self.client.conversations_info(channel=channel["id"])
+            if response["ok"]:
+                return {**channel, **response["channel"]}
+        except api_errors() as e:
+            self.log.error(f"Error fetching channel info: {e.response['error']}")
+        return None
+
+    def get_last_message(self, channel_id, oldest=None):
+        try:
+            with self.metrics.phase("history_fetching"):
+                response = self.client.conversations_history(
+                    channel=channel_id, oldest=oldest, limit=1, include_all_metadata=False
+                )
+            if response["ok"] and response["messages"]:
+                return response["messages"][0]
+        except api_errors() as e:
+            # Still rate limited after the retries, don't mistake the channel for an empty one
+            if e.response['error'] == 'ratelimited':
+                raise
+            self.log.error(f"Error fetching last message: {e.response['error']}")
+        return None
+
+    def _now(self):
+        return time.time() if self.now is None else self.now
+
+    def stage_done(self, channel_id, stage):
+        return self.checkpoint is not None and self.checkpoint.done(channel_id, stage)
+
+    def mark_stage(self, channel_id, stage, result=None):
+        if self.checkpoint is not None:
+            self.checkpoint.mark(channel_id, stage, result)
+
+    def get_last_activity(self, channel):
+        """(last_ts, None) with the channel's last activity as a Unix timestamp, or (None, cutoff)
+        when nothing was posted after the history cutoff (see history_cutoff()): the channel has
+        been quiet since at least then, but how much longer isn't looked up."""
+        if self.stage_done(channel["id"], "history"):
+            result = self.checkpoint.result(channel["id"], "history")
+            # Sweeps started by earlier versions stored a bare timestamp
+            return tuple(result) if isinstance(result, list) else (result, None)
+
+        thresholds = self.policy.thresholds(channel)
+        cached_ts = self.activity_cache.last_ts_if_fresh(
+            channel["id"], thresholds.warn_after, self.run_interval, now=self._now()
+        )
+        if cached_ts:
+            return cached_ts, None
+
+        # Only messages newer than the cutoff are asked for: an empty answer means
+        # no activity since the cutoff, and quiet channels send no message bodies
+        cutoff = history_cutoff(thresholds, self._now())
+        last_message = self.get_last_message(channel["id"], oldest=f"{cutoff:.6f}")
+        if last_message and last_message.get("user"):
+            self._last_posters[channel["id"]] = last_message["user"]
+        self.activity_cache.update(
+            channel["id"],
+            last_ts=float(last_message["ts"]) if last_message else None,
+            creator=channel.get("creator"),
+            created=float(channel["created"]),
+        )
+        if last_message:
+            activity = float(last_message["ts"]), None
+        elif float(channel["created"]) > cutoff:
+            # Nothing posted since it was created, so that's its last activity
+            activity = float(channel["created"]), None
+        else:
+            activity = None, cutoff
+        self.mark_stage(channel["id"], "history", list(activity))
+        return activity
+
+    def send_notification(self, user_id, message):
+        try:
+            with self.metrics.phase("notification"):
+                response = self.client.chat_postMessage(channel=user_id, text=message)
+            return response["ok"]
+        except api_errors() as e:
+            if e.response['error'] == 'channel_not_found':
+                self.log.warning(f"User {user_id} not found or cannot be messaged")
+            else:
+                self.log.error(f"Error sending notification: {e.response['error']}")
+            return False
+
+    def notify_housekeeping(self, kind, channel_name, message):
+        if self.housekeeping_digest is not None:
+            self.housekeeping_digest.add(kind, channel_name, message)
+        else:
+            with self.metrics.phase("notification"):
+                self.client.chat_postMessage(channel="#housekeeping", text=message)
+
+    def flush_creator_notices(self):
+        if self._notices is None:
+            return
+        with self.metrics.phase("notification"):
+            warned = self.creator_notices.flush()
+        if warned:
+            self.log.info(f"Inactivity warnings sent to {warned} creators")
+
+    def flush_housekeeping_digest(self):
+        if self.housekeeping_digest is None:
+            return
+        try:
+            with self.metrics.phase("notification"):
+                messages = self.housekeeping_digest.flush()
+            if messages:
+                self.log.info(f"Housekeeping digest posted in {messages} messages")
+        except api_errors() as e:
+            self.log.error(f"Error posting housekeeping digest: {e.response['error']}")
+
+    def channels_to_check(self, inventory):
+        """The active channels worth a look: dead ones first (no API calls), then the rest oldest first."""
+        groups = prefilter(inventory.active, self.policy, now=self._now())
+        self.log.info(
+            f"Prefilter: {len(groups[DEAD])} empty channels to archive from list data, "
+            f"{len(groups[UNREADABLE])} private channels skipped (not a member), {len(groups[PROBE])} to check"
+        )
+        for channel in groups[UNREADABLE]:
+            self.record_snapshot(channel, "skip")
+        return groups[DEAD] + groups[PROBE]
+
+    def process_channels(self, inventory):
+        """Checks every active channel and returns how many were warned and archived, and
+        how many warnings were skipped (already sent for the same inactivity, or nobody to send to).
+
+        Archives are handed to an ArchiveExecutor, so scanning workers don't
+        wait for them; archive_results gets its per-channel results table.
+        """
+        results = Counter()
+        self._archiver = ArchiveExecutor(self.archive_and_mark, workers=self.scan_workers)
+        try:
+            # The inventory is already complete, only the scan over it goes page by page
+            for result in iter_scan(paginate(self.channels_to_check(inventory)), self.process_single_channel,
+                                    self.scan_workers):
+                results[result] += 1
+        except api_errors() as e:
+            self.log.error(f"API error: {e.response['error']}")
+        finally:
+            archiver, self._archiver = self._archiver, None
+            self.archive_results = archiver.results()
+
+        if results["warn_skipped"]:
+            self.log.info(f"{results['warn_skipped']} inactive channels not warned about again, or with nobody to warn")
+        failed = sum(not result["archived"] for result in self.archive_results)
+        if failed:
+            self.log.warning(f"{failed} of {len(self.archive_results)} archives failed")
+            results["archived"] -= failed
+        return results
+
+    def process_single_channel(self, channel):
+        api_seconds = self.metrics.thread_api_seconds()
+        inspected = self.inspect_channel(channel)
+        if not inspected:
+            self.record_snapshot(channel, "skip", api_seconds=self.metrics.thread_api_seconds() - api_seconds)
+            return None
+
+        channel_info, creator_id, last_ts, inactivity = inspected
+        result = self.act_on_inactivity(channel_info, creator_id, inactivity, exact=last_ts is not None)
+        self.record_snapshot(
+            channel_info, {"archived": "archive", "warned": "warn", "warn_skipped": "warn"}.get(result, "none"),
+            last_ts=last_ts, api_seconds=self.metrics.thread_api_seconds() - api_seconds,
+        )
+        return result
+
+    def record_snapshot(self, channel, decision, last_ts=None, api_seconds=0.0):
+        if self.snapshot is not None:
+            archive_after = self.policy.thresholds(channel).archive_after
+            self.snapshot.add(channel, decision, last_ts, archive_after, api_seconds)
+
+    def inspect_channel(self, channel):
+        """Reads only: (channel_info, creator_id, last_ts, inactivity), or None if the channel is skipped.
+
+        last_ts is None for channels quiet since the history cutoff (see get_last_activity()),
+        their inactivity is then the time since the cutoff, a lower bound.
+        """
+        self.log.info(f"Processing channel: {channel['name']} ({channel['id']})")
+
+        if self.whitelist.matches(channel):
+            self.log.info("Skipping whitelisted channel")
+            return None
+
+        thresholds = self.policy.thresholds(channel)
+        if thresholds.keep:
+            self.log.info(f"Skipping channel kept by policy ({thresholds.rule})")
+            return None
+
+        if channel.get("is_archived"):
+            return None
+
+        channel_info = self.get_channel_info(channel)
+        if not channel_info:
+            return None
+
+        creator_id = channel_info.get("creator")
+        if not creator_id:
+            self.log.warning("Could not determine channel creator")
+            return None
+
+        verdict = classify(channel_info, self.policy, now=self._now())
+        if verdict == UNREADABLE:
+            self.log.info("Skipping private channel, not a member")
+            return None
+        try:
+            if verdict == DEAD:
+                # Nobody left to post, so the last change to the channel is as good as its last message
+                last_ts, quiet_since = last_update(channel_info), None
+            else:
+                last_ts, quiet_since = self.get_last_activity(channel_info)
+        except KeyError:
+            self.log.error("Invalid channel data format")
+            return None
+        except api_errors() as e:
+            self.log.error(f"Skipping channel, still rate limited after retries: {e.response['error']}")
+            return None
+
+        since = last_ts if last_ts is not None else quiet_since
+        return channel_info, creator_id, last_ts, timedelta(seconds=self._now() - since)
+
+    def decide(self, channel, inactivity, exact=True):
+        """Policy.decide(), except that channels quiet since the history cutoff (exact=False) are archived:
+        they're past both thresholds, even when their inactivity is measured right at the cutoff."""
+        if not exact and not self.policy.thresholds(channel).keep:
+            return "archive"
+        return self.policy.decide(channel, inactivity)
+
+    def act_on_inactivity(self, channel, creator_id, inactivity, exact=True):
+        # Archives finished before an interruption aren't repeated, and the warnings ledger
+        # keeps creators from being warned twice about the same inactivity
+        action = self.decide(channel, inactivity, exact)
+        if action == "archive":
+            if self.stage_done(channel["id"], "archive"):
+                # The digest wasn't posted before the interruption, so the entry goes back in
+                self.notify_housekeeping(
+                    "archived", channel["name"], f"Channel #{channel['name']} is being archived due to inactivity"
+                )
+            elif self._archiver is not None:
+                self._archiver.submit(channel)
+            else:
+                self.archive_and_mark(channel)
+            return "archived"
+        elif action == "warn":
+            # Only counted as warned if a warning was queued, not when the creator was already
+            # warned about this inactivity or there's nobody to warn
+            if self.notify_creator(channel, creator_id, inactivity, exact):
+                return "warned"
+            return "warn_skipped"
+        return None
+
+    def notification_recipient(self, channel, creator_id):
+        """The creator, or if they can't be sent a DM, the channel's last poster or the fallback admin."""
+        recipient = self.user_directory.recipient(creator_id, self._last_posters.get(channel["id"]), self.fallback_admin)
+        if recipient != creator_id:
+            self.log.info(f"Creator {creator_id} can't be notified, warning {recipient or 'nobody'} instead")
+        return recipient
+
+    def notify_creator(self, channel, creator_id, inactivity, exact=True):
+        """Queues the warning, it's sent with the creator's other ones by flush_creator_notices().
+
+        With exact=False, `inactivity` is only a lower bound (see inspect_channel()).
+        """
+        recipient = self.notification_recipient(channel, creator_id)
+        if not recipient:
+            return False
+        remaining = self.policy.thresholds(channel).archive_after - inactivity
+        last_activity = self._now() - inactivity.total_seconds()
+        if self.creator_notices.add(recipient, channel, last_activity, remaining, exact=exact):
+            return True
+        self.log.info("Creator already warned, no activity since")
+        return False
+
+    def archive_channel(self, channel_id, channel_name):
+        try:
+            # The final notice goes out before the channel is archived
+            housekeeping_msg = f"Channel #{channel_name} is being archived due to inactivity"
+            self.notify_housekeeping("archived", channel_name, housekeeping_msg)
+
+            with self.metrics.phase("archive"):
+                response = self.client.conversations_archive(channel=channel_id)
+            if response["ok"]:
+                self.log.info(f"Successfully archived channel {channel_name}")
+                # Kept for the delete phase, which counts from the archive
+                self.activity_cache.mark_archived(channel_id)
+                return True
+            self.log.error(f"Failed to archive channel: {response['error']}")
+        except api_errors() as e:
+            if e.response['error'] == 'already_archived':
+                self.log.info(f"Channel {channel_name} was already archived")
+                return True
+            self.log.error(f"Error archiving channel: {e.response['error']}")
+        return False
+
+    def archive_and_mark(self, channel):
+        if self.archive_channel(channel["id"], channel["name"]):
+            self.mark_stage(channel["id"], "archive")
+            return True
+        return False
+
+    def delete_archived_channel(self, channel):
+        """Deletes one archived channel. Failures are logged and only cost that channel (False),
+        the rest of the cleanup and the inactivity sweep after it go on."""
+        if self.stage_done(channel["id"], "delete"):
+            return True
+        try:
+            self.client.admin_conversations_delete(channel_id=channel["id"])
+        except AttributeError:
+            # slack_sdk releases from before the admin API
+            self.log.error(f"Can't delete channel {channel['name']}, the client has no admin_conversations_delete")
+            return False
+        except api_errors() as e:
+            if e.response['error'] == 'channel_not_found':
+                # Deleted already, e.g. just before the previous run was interrupted
+                self.mark_stage(channel["id"], "delete")
+                return True
+            if e.response['error'] == 'method_not_supported':
+                self.log.info(f"Skipping delete for channel {channel['name']} (plan restriction)")
+            else:
+                self.log.error(f"Error deleting archived channel {channel['name']}: {e.response['error']}")
+            return False
+        self.log.info(f"Deleted old archived channel: {channel['name']}")
+        self.mark_stage(channel["id"], "delete")
+        return True
+
+    def old_archived_channels(self, inventory):
+        """Archived channels that were archived longer ago than their delete threshold."""
+        old = []
+        for channel in inventory.archived:
+            archived = archived_at(channel, self.activity_cache)
+            if archived is None:
+                self.log.warning(f"Not deleting {channel['name']}, when it was archived isn't known")
+            elif inventory.taken_at - archived > self.policy.thresholds(channel).delete_archived_after.total_seconds():
+                old.append(channel)
+        return old
+
+    def clean_old_archived(self, inventory):
+        """Deletes the old archived channels, returns how many were deleted and how many couldn't be."""
+        started = time.monotonic()
+        examined = len(inventory.archived)
+        deleted = 0
+
+        if not self.delete_archived:
+            self.log.info("Not deleting old archived channels, delete_archived is off")
+            for channel in inventory.archived:
+                self.record_snapshot(channel, "archived")
+            return 0, 0
+
+        old_archived = self.old_archived_channels(inventory)
+        if self.snapshot is not None:
+            old_ids = {channel["id"] for channel in old_archived}
+            for channel in inventory.archived:
+                if channel["id"] not in old_ids:
+                    self.record_snapshot(channel, "archived")
+
+        # Bound, so the deletes made by the workers count towards clean_old_archived
+        delete = self.metrics.bind(self.delete_archived_channel)
+        for channel, result in zip(old_archived, iter_scan(paginate(old_archived), delete, self.scan_workers)):
+            deleted += result
+            self.record_snapshot(channel, "delete" if result else "archived")
+
+        failed = len(old_archived) - deleted
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.log.info(
+            f"Cleanup examined {examined} archived channels ({examined / elapsed:.1f}/s), "
+            f"deleted {deleted} ({deleted / elapsed:.2f}/s) in {elapsed:.1f}s"
+        )
+        if failed:
+            self.log.warning(f"{failed} of {len(old_archived)} old archived channels couldn't be deleted")
+        return deleted, failed
+
+    def list_channels(self, checkpoint=None):
+        with self.metrics.phase("channel_listing"):
+            return build_inventory(self.client, checkpoint=checkpoint, team_id=self.team_id)
+
+    def run(self):
+        """One full sweep. Returns a summary of what it did."""
+        started = time.monotonic()
+        self.now = time.time()
+        self.log.info("Starting channel cleanup process")
+        if self.checkpoint_path:
+            self.checkpoint = SweepCheckpoint(self.checkpoint_path)
+            self.checkpoint.begin(self.run_interval)
+        if self.snapshot_dir:
+            self.snapshot = RunSnapshot()
+
+        # One inventory for both the delete and the archive phase
+        try:
+            inventory = self.list_channels(self.checkpoint)
+        except api_errors() as e:
+            self.log.error(f"Failed to fetch channels list: {e.response['error']}")
+            raise
+        self.log.info(f"Found {len(inventory.active)} active and {len(inventory.archived)} archived channels")
+        with self.metrics.phase("clean_old_archived"):
+            deleted, delete_failed = self.clean_old_archived(inventory)
+        results = self.process_channels(inventory)
+        self.flush_creator_notices()
+        self.flush_housekeeping_digest()
+        # An incomplete listing (an error part way through pagination) is finished by the next run
+        if self.checkpoint is not None and self.checkpoint.listed:
+            self.checkpoint.finish()
+        self.log.info("Process completed")
+        if self.snapshot is not None:
+            path = self.snapshot.save(self.snapshot_dir, self.snapshot_format)
+            self.log.info(f"Snapshot of {len(self.snapshot)} channels saved to {path}")
+            self.snapshot = None
+        self.report_metrics()
+
+        return {
+            "workspace": self.name,
+            "channels": len(inventory),
+            "deleted": deleted,
+            "delete_failed": delete_failed,
+            "warned": results["warned"],
+            "warn_skipped": results["warn_skipped"],
+            "archived": results["archived"],
+            "api_calls": sum(self.metrics.calls.values()),
+            "seconds": round(time.monotonic() - started, 1),
+        }
+
+    def build_plan(self, inventory):
+        """Works out what run() would do, without any write calls."""
+        plan = Plan()
+
+        for channel in self.old_archived_channels(inventory) if self.delete_archived else ():
+            delete_after = self.policy.thresholds(channel).delete_archived_after
+            plan.add("delete", channel, f"archived more than {delete_after.days} days ago",
+                     last_activity=archived_at(channel, self.activity_cache))
+
+        def plan_single_channel(channel):
+            inspected = self.inspect_channel(channel)
+            if not inspected:
+                return None
+            channel_info, creator_id, last_ts, inactivity = inspected
+            action = self.decide(channel_info, inactivity, exact=last_ts is not None)
+            if action:
+                return action, channel_info, last_ts, inactivity
+            return None
+
+        for result in iter_scan(paginate(self.channels_to_check(inventory)), plan_single_channel, self.scan_workers):
+            if result:
+                action, channel_info, last_ts, inactivity = result
+                if last_ts is None:
+                    # Quiet since the history cutoff, how long exactly isn't known
+                    plan.add(action, channel_info, f"inactive for more than {inactivity.days} days")
+                else:
+                    plan.add(
+                        action, channel_info, f"inactive for {inactivity.days} days",
+                        last_activity=last_ts, inactive_seconds=inactivity.total_seconds(),
+                    )
+        return plan
+
+    def plan(self, path):
+        self.now = time.time()
+        inventory = self.list_channels()
+        with self.metrics.phase("planning"):
+            plan = self.build_plan(inventory)
+        plan.save(path)
+        counts = plan.counts()
+        self.log.info(
+            f"Plan saved to {path}: {counts['warn']} to warn, "
+            f"{counts['archive']} to archive, {counts['delete']} to delete"
+        )
+        self.report_metrics()
+        return plan
+
+    def apply_plan(self, plan):
+        """Carries out a plan saved by plan(). Returns how many actions of each kind were done.
+
+        Channels to warn or archive are checked for new messages first, so
+        ones that became active after the plan was made are left alone.
+        """
+        self.now = time.time()
+        age = timedelta(seconds=self.now - plan.planned_at)
+        if age > self.run_interval:
+            self.log.warning(f"Plan is {age} old, channels that became active since it was made will be skipped")
+
+        def active_since_planned(entry):
+            # Channels were scanned after planned_at, so anything newer was posted since
+            if self.get_last_message(entry["channel_id"], oldest=f"{plan.planned_at:.6f}"):
+                self.log.info(f"Skipping {entry['action']} of {entry['channel_name']}, active since the plan was made")
+                return True
+            return False
+
+        def warn(entry):
+            if active_since_planned(entry):
+                return False
+            # The channel as it was listed, so the policy and the notice see the same channel as the plan did
+            channel = entry["channel"] or {"id": entry["channel_id"], "name": entry["channel_name"],
+                                           "creator": entry["creator"]}
+            # Inactivity is worked out again, time has passed since the plan was made
+            if entry["last_activity"] is not None:
+                inactivity = timedelta(seconds=self.now - entry["last_activity"])
+                return self.notify_creator(channel, entry["creator"], inactivity)
+            # Quiet since the history cutoff of the plan, that's all that's known
+            cutoff = history_cutoff(self.policy.thresholds(channel), plan.planned_at)
+            inactivity = timedelta(seconds=self.now - cutoff)
+            return self.notify_creator(channel, entry["creator"], inactivity, exact=False)
+
+        def archive(entry):
+            if active_since_planned(entry):
+                return False
+            return self.archive_channel(entry["channel_id"], entry["channel_name"])
+
+        def delete(entry):
+            if not self.delete_archived:
+                self.log.info(f"Skipping delete of {entry['channel_name']}, delete_archived is off")
+                return False
+            with self.metrics.phase("clean_old_archived"):
+                return self.delete_archived_channel({"id": entry["channel_id"], "name": entry["channel_name"]})
+
+        done = execute_plan(plan, {"warn": warn, "archive": archive, "delete": delete}, self.scan_workers)
+        self.flush_creator_notices()
+        self.flush_housekeeping_digest()
+        self.log.info(f"Plan executed: {done['warn']} warned, {done['archive']} archived, {done['delete']} deleted")
+        self.report_metrics()
+        return done
+
+    def build_activity_index(self, inventory):
+        # Channel state is fetched once, after that the index is kept up to date by events
+        index = ActivityIndex(self.activity_cache)
+
+        def add_channel(channel):
+            channel_info = self.get_channel_info(channel)
+            if channel_info:
+                last_ts, _ = self.get_last_activity(channel_info)
+                if last_ts is None:
+                    # The index is kept up to date from here on, so it starts from the real last message
+                    last_message = self.get_last_message(channel_info["id"])
+                    last_ts = float(last_message["ts"]) if last_message else None
+                index.add(channel_info, last_ts=last_ts)
+
+        for _ in iter_scan(paginate(inventory.active), add_channel, self.scan_workers):
+            pass
+
+        self.log.info(f"Indexed {len(index)} channels")
+        return index
+
+    def sweep_index(self, index):
+        self.now = time.time()
+        for entry, inactive_seconds in index.inactive(self.policy.min_warn_after, now=self.now):
+            channel_info = self.get_channel_info(entry)
+            if not channel_info or self.whitelist.matches(channel_info):
+                continue
+
+            inactivity = timedelta(seconds=inactive_seconds)
+            # Don't warn again if nothing has changed since the last warning
+            if (self.policy.decide(channel_info, inactivity) == "warn"
+                    and entry["warned_for"] == (entry["last_ts"] or entry["created"])):
+                continue
+
+            result = self.act_on_inactivity(channel_info, channel_info.get("creator"), inactivity)
+            if result == "archived":
+                index.set_archived(entry["id"])
+            elif result in ("warned", "warn_skipped"):
+                index.mark_warned(entry["id"])
+
+        index.flush()
+        self.flush_creator_notices()
+        self.flush_housekeeping_digest()
+        self.report_metrics()
+
+    def replay(self, path):
+        """Sweeps an index built from recorded events. Only runs on a Housekeeper whose client is an
+        offline one like FakeSlack (see fake_workspace()), as the timestamps in the file say nothing
+        about the real channels."""
+        if not getattr(self._given_client, "offline", False):
+            raise ValueError("Replaying events needs a FakeSlack client, it never runs against a real workspace")
+        index = ActivityIndex(self.activity_cache)
+        replay_events(path, index)
+        self.sweep_index(index)
+        slack = self._given_client
+        self.log.info(
+            f"Replay done: {slack.calls['chat_postMessage']} messages and "
+            f"{slack.calls['conversations_archive']} archives in the fake workspace, nothing was sent to Slack"
+        )
+
+    def listen(self, app_token, sweep_interval):
+        self.now = time.time()
+        index = self.build_activity_index(self.list_channels())
+        self.sweep_index(index)
+        run_socket_mode(app_token, index, lambda: self.sweep_index(index), sweep_interval)
+
+    def report_metrics(self):
+        for line in self.metrics.summary():
+            self.log.info(line)
+        if self.metrics_textfile:
+            self.metrics.write_textfile(self.metrics_textfile)
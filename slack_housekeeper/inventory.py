@@ -0,0 +1,67 @@
+"""A single channel listing shared by every phase of a run."""
+import time
+
+from slack_housekeeper.channels import iter_channel_pages
+
+
+class Inventory:
+    """Every channel of the workspace, as returned by conversations_list, split by archived state.
+
+    The delete and archive phases both work from the same snapshot, so they
+    agree on what the workspace looked like and the list is only fetched once.
+    The price is that every channel is held in memory, and nothing is checked
+    until the whole listing is done.
+    """
+
+    def __init__(self, channels=(), taken_at=None):
+        self.active = []
+        self.archived = []
+        self.by_id = {}
+        self.taken_at = time.time() if taken_at is None else taken_at
+        for channel in channels:
+            self.add(channel)
+
+    def add(self, channel):
+        self.by_id[channel["id"]] = channel
+        if channel.get("is_archived"):
+            self.archived.append(channel)
+        else:
+            self.active.append(channel)
+
+    def __len__(self):
+        return len(self.by_id)
+
+
+def build_inventory(client, types="public_channel,private_channel", page_size=1000, checkpoint=None, team_id=None):
+    """Lists every channel; with a SweepCheckpoint, pages already fetched by an interrupted run are reused.
+
+    `team_id` picks the workspace when an Enterprise Grid org token is used.
+    """
+    inventory = Inventory()
+    list_pages = checkpoint.iter_pages if checkpoint is not None else iter_channel_pages
+    kwargs = {"team_id": team_id} if team_id else {}
+    for page in list_pages(client, types=types, exclude_archived=False, limit=page_size, **kwargs):
+        for channel in page:
+            inventory.add(channel)
+    return inventory
+
+
+def archived_at(channel, activity_cache=None):
+    """When an archived channel was archived, as a Unix timestamp, or None if that isn't known.
+
+    Archives made by the housekeeper are recorded in the ActivityCache. For the
+    others, `updated` (in milliseconds) is the last change made to the channel,
+    which for an archived channel is its archiving. `created` says nothing about it.
+    """
+    if activity_cache is not None:
+        recorded = activity_cache.archived_at(channel["id"])
+        if recorded is not None:
+            return recorded
+    updated = channel.get("updated")
+    return updated / 1000 if updated else None
+
+
+def paginate(channels, size=200):
+    """Splits a list of channels into pages, for the code that processes them page by page."""
+    for start in range(0, len(channels), size):
+        yield channels[start:start + size]
@@ -0,0 +1,200 @@
+"""Per-phase timing and Slack API call instrumentation.
+
+Every API call made through a RequestScheduler that has a Metrics object is
+counted under the phase the calling thread is in (see Metrics.phase), with
+its latency, retries and the time spent waiting for rate limit tokens. The
+result can be written as a Prometheus textfile (for node_exporter's textfile
+collector), served over HTTP in the OpenMetrics text format, or logged as a
+short run summary.
+"""
+import contextlib
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "slack_housekeeper"
+
+# Upper bounds, in seconds, of the API call latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Phase of calls made outside any Metrics.phase() block
+NO_PHASE = "other"
+
+
+def _labels(**labels):
+    return ",".join(f'{name}="{value}"' for name, value in labels.items())
+
+
+class Metrics:
+
+    def __init__(self, labels=None):
+        # Added to every series, e.g. {"workspace": "engineering"} when several workspaces share a collector
+        self.labels = labels or {}
+        self.started = time.time()
+        self.calls = Counter()
+        self.errors = Counter()
+        self.retries = Counter()
+        self.ratelimit_wait = defaultdict(float)
+        self.latency_sum = defaultdict(float)
+        self.latency_buckets = defaultdict(lambda: [0] * len(LATENCY_BUCKETS))
+        self.phase_seconds = defaultdict(float)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _label_set(self, **labels):
+        labels = {**self.labels, **labels}
+        return "{" + _labels(**labels) + "}" if labels else ""
+
+    def _stack(self):
+        if not hasattr(self._local, "phases"):
+            self._local.phases = []
+        return self._local.phases
+
+    def current_phase(self):
+        stack = self._stack()
+        return stack[-1] if stack else NO_PHASE
+
+    @contextlib.contextmanager
+    def phase(self, name, timed=True):
+        """Attributes everything in the block to phase `name` and adds up its duration."""
+        stack = self._stack()
+        stack.append(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            stack.pop()
+            if timed:
+                with self._lock:
+                    self.phase_seconds[name] += time.perf_counter() - started
+
+    def bind(self, fn):
+        """Wraps `fn` to run in the caller's current phase, for work handed to worker threads."""
+        phase = self.current_phase()
+
+        def run(*args, **kwargs):
+            with self.phase(phase, timed=False):
+                return fn(*args, **kwargs)
+
+        return run
+
+    def thread_api_seconds(self):
+        """Time the calling thread has spent in API calls and rate limit waits, for timing single channels."""
+        return getattr(self._local, "api_seconds", 0.0)
+
+    def record_call(self, method, seconds, failed=False):
+        key = (self.current_phase(), method)
+        self._local.api_seconds = self.thread_api_seconds() + seconds
+        with self._lock:
+            self.calls[key] += 1
+            self.errors[key] += failed
+            self.latency_sum[key] += seconds
+            buckets = self.latency_buckets[key]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+
+    def record_retry(self, method):
+        with self._lock:
+            self.retries[(self.current_phase(), method)] += 1
+
+    def record_wait(self, method, seconds):
+        if seconds:
+            self._local.api_seconds = self.thread_api_seconds() + seconds
+            with self._lock:
+                self.ratelimit_wait[(self.current_phase(), method)] += seconds
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            lines = [
+                f"# HELP {PREFIX}_api_calls_total Slack API calls made.",
+                f"# TYPE {PREFIX}_api_calls_total counter",
+            ]
+            lines += [f"{PREFIX}_api_calls_total{self._label_set(phase=p, method=m)} {n}" for (p, m), n in sorted(self.calls.items())]
+            lines += [
+                f"# HELP {PREFIX}_api_errors_total Slack API calls that failed.",
+                f"# TYPE {PREFIX}_api_errors_total counter",
+            ]
+            lines += [f"{PREFIX}_api_errors_total{self._label_set(phase=p, method=m)} {n}" for (p, m), n in sorted(self.errors.items())]
+            lines += [
+                f"# HELP {PREFIX}_api_retries_total Slack API calls retried after a 429.",
+                f"# TYPE {PREFIX}_api_retries_total counter",
+            ]
+            lines += [f"{PREFIX}_api_retries_total{self._label_set(phase=p, method=m)} {n}" for (p, m), n in sorted(self.retries.items())]
+            lines += [
+                f"# HELP {PREFIX}_ratelimit_wait_seconds_total Time spent waiting for rate limit tokens.",
+                f"# TYPE {PREFIX}_ratelimit_wait_seconds_total counter",
+            ]
+            lines += [
+                f"{PREFIX}_ratelimit_wait_seconds_total{self._label_set(phase=p, method=m)} {s:.6f}"
+                for (p, m), s in sorted(self.ratelimit_wait.items())
+            ]
+            lines += [
+                f"# HELP {PREFIX}_api_call_duration_seconds Slack API call latency.",
+                f"# TYPE {PREFIX}_api_call_duration_seconds histogram",
+            ]
+            for (p, m), buckets in sorted(self.latency_buckets.items()):
+                for bound, count in zip(LATENCY_BUCKETS, buckets):
+                    lines.append(f"{PREFIX}_api_call_duration_seconds_bucket{self._label_set(phase=p, method=m, le=bound)} {count}")
+                lines.append(f"{PREFIX}_api_call_duration_seconds_bucket{self._label_set(phase=p, method=m, le='+Inf')} {self.calls[(p, m)]}")
+                lines.append(f"{PREFIX}_api_call_duration_seconds_sum{self._label_set(phase=p, method=m)} {self.latency_sum[(p, m)]:.6f}")
+                lines.append(f"{PREFIX}_api_call_duration_seconds_count{self._label_set(phase=p, method=m)} {self.calls[(p, m)]}")
+            lines += [
+                f"# HELP {PREFIX}_phase_seconds_total Time spent in each phase, summed over worker threads.",
+                f"# TYPE {PREFIX}_phase_seconds_total counter",
+            ]
+            lines += [f"{PREFIX}_phase_seconds_total{self._label_set(phase=p)} {s:.6f}" for p, s in sorted(self.phase_seconds.items())]
+            lines += [
+                f"# HELP {PREFIX}_run_started_timestamp_seconds When this run started.",
+                f"# TYPE {PREFIX}_run_started_timestamp_seconds gauge",
+                f"{PREFIX}_run_started_timestamp_seconds{self._label_set()} {self.started:.3f}",
+            ]
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        # Written next to the target and renamed, so the collector never reads half a file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def summary(self):
+        """Human readable lines: one per phase with its calls, latency, retries and rate limit waits."""
+        with self._lock:
+            phases = sorted(set(self.phase_seconds) | {p for p, _ in self.calls})
+            lines = [f"Run took {time.time() - self.started:.1f}s"]
+            for phase in phases:
+                keys = [key for key in self.calls if key[0] == phase]
+                calls = sum(self.calls[key] for key in keys)
+                latency = sum(self.latency_sum[key] for key in keys)
+                retries = sum(self.retries[key] for key in self.retries if key[0] == phase)
+                waited = sum(self.ratelimit_wait[key] for key in self.ratelimit_wait if key[0] == phase)
+                mean = f"{latency / calls * 1000:.0f}ms" if calls else "-"
+                lines.append(
+                    f"{phase}: {self.phase_seconds.get(phase, 0.0):.1f}s, {calls} calls (mean {mean}), "
+                    f"{retries} retries, {waited:.1f}s waiting for rate limits"
+                )
+        return lines
+
+    def serve(self, port, host=""):
+        """Serves /metrics on a background thread, for long-running processes."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                data = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
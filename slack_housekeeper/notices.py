@@ -0,0 +1,84 @@
+"""Inactivity warnings grouped by creator: one DM per creator per run instead of one per channel."""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Slack truncates longer message texts, longer DMs are split at channel boundaries
+MESSAGE_CHARS = 4000
+
+
+class CreatorNotices:
+    """Collects the run's inactivity warnings and DMs each creator once in flush().
+
+    `send(user_id, text)` posts a DM and returns whether it went out. With a
+    `ledger` (an ActivityCache) every warning that was sent is remembered, and
+    a channel isn't warned about again until it has had activity after the
+    warning, however many runs happen in between.
+    """
+
+    def __init__(self, send, ledger=None):
+        self.send = send
+        self.ledger = ledger
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def add(self, creator_id, channel, last_activity, remaining, exact=True):
+        """Queues a warning; returns False if the creator was already warned about this inactivity.
+
+        With exact=False, `last_activity` is only a time the channel has been quiet since,
+        and the warning says it has been inactive for more than that.
+        """
+        if self.ledger is not None:
+            warned_at = self.ledger.warned_at(channel["id"])
+            if warned_at is not None and last_activity < warned_at:
+                return False
+        with self._lock:
+            self._pending.setdefault(creator_id, {})[channel["id"]] = (channel["name"], last_activity, remaining, exact)
+        return True
+
+    def __len__(self):
+        return sum(len(channels) for channels in self._pending.values())
+
+    def _messages(self, channels, now):
+        lines = []
+        for name, last_activity, remaining, exact in sorted(channels.values()):
+            days = int((now - last_activity) // 86400)
+            inactive = f"{days} days" if exact else f"more than {days} days"
+            lines.append(f"• #{name}: inactive for {inactive}, archived in {max(remaining.days, 0)} days")
+
+        if len(lines) == 1:
+            header = "A channel you created has been inactive for a while:"
+            footer = "It will be archived unless someone posts in it. To keep it, just send a message."
+        else:
+            header = f"{len(lines)} channels you created have been inactive for a while:"
+            footer = "They will be archived unless someone posts in them. To keep a channel, just send a message."
+
+        messages = []
+        text = header
+        for line in lines:
+            if len(text) + len(line) + 1 > MESSAGE_CHARS:
+                messages.append(text)
+                text = ""
+            text = f"{text}\n{line}" if text else line
+        messages.append(f"{text}\n{footer}")
+        return messages
+
+    def flush(self):
+        """DMs every creator with warnings pending and returns how many creators were warned."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        now = time.time()
+        warned = 0
+        for creator_id, channels in pending.items():
+            delivered = all([self.send(creator_id, text) for text in self._messages(channels, now)])
+            if not delivered:
+                logger.warning(f"Could not warn {creator_id} about {len(channels)} inactive channels")
+                continue
+            warned += 1
+            if self.ledger is not None:
+                for channel_id in channels:
+                    self.ledger.mark_warned(channel_id, creator_id, now)
+        return warned
@@ -0,0 +1,104 @@
+"""Housekeeping plans: what a run would do, computed without any write calls.
+
+A plan is a list of actions ("warn", "archive" or "delete"), one per channel,
+with the reason, the activity timestamps it was based on (empty for channels
+that have been quiet since the history cutoff, whose last activity wasn't
+looked up) and the channel record as it was listed. It is saved as JSON, or
+as Parquet when the path ends in .parquet and pyarrow is installed, so it can
+be reviewed before a separate run applies it with execute_plan().
+"""
+import json
+import logging
+import time
+
+from slack_housekeeper.scan import scan_channels
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ("warn", "archive", "delete")
+
+FIELDS = ("action", "channel_id", "channel_name", "creator", "reason", "last_activity", "inactive_seconds", "channel")
+
+
+class Plan:
+
+    def __init__(self, actions=(), planned_at=None):
+        self.planned_at = time.time() if planned_at is None else planned_at
+        self.actions = []
+        for action in actions:
+            entry = {field: action.get(field) for field in FIELDS}
+            if isinstance(entry["channel"], str):
+                # Parquet plans keep the record as JSON, channels don't all have the same fields
+                entry["channel"] = json.loads(entry["channel"])
+            self.actions.append(entry)
+
+    def add(self, action, channel, reason, last_activity=None, inactive_seconds=None):
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown plan action: {action}")
+        self.actions.append({
+            "action": action,
+            "channel_id": channel["id"],
+            "channel_name": channel.get("name"),
+            "creator": channel.get("creator"),
+            "reason": reason,
+            "last_activity": last_activity,
+            "inactive_seconds": inactive_seconds,
+            "channel": dict(channel),
+        })
+
+    def __len__(self):
+        return len(self.actions)
+
+    def counts(self):
+        return {action: sum(1 for entry in self.actions if entry["action"] == action) for action in ACTIONS}
+
+    def save(self, path):
+        if str(path).endswith(".parquet"):
+            self._save_parquet(path)
+            return
+        with open(path, "w") as f:
+            json.dump({"planned_at": self.planned_at, "actions": self.actions}, f, indent=1)
+
+    def _save_parquet(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Saving a plan as Parquet needs pyarrow, use a .json path instead") from e
+        columns = {field: [entry[field] for entry in self.actions] for field in FIELDS}
+        columns["channel"] = [json.dumps(channel) if channel is not None else None for channel in columns["channel"]]
+        table = pa.table(columns)
+        table = table.replace_schema_metadata({"planned_at": str(self.planned_at)})
+        pq.write_table(table, path)
+
+    @classmethod
+    def load(cls, path):
+        if str(path).endswith(".parquet"):
+            import pyarrow.parquet as pq
+
+            table = pq.read_table(path)
+            planned_at = float(table.schema.metadata[b"planned_at"])
+            return cls(table.to_pylist(), planned_at)
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["actions"], data["planned_at"])
+
+
+def execute_plan(plan, handlers, workers=1):
+    """Runs every action of `plan` with handlers[action](entry), `workers` at a time.
+
+    Each channel has at most one action, so they can run in any order.
+    Returns how many actions of each kind succeeded.
+    """
+    done = dict.fromkeys(ACTIONS, 0)
+
+    def run(entry):
+        try:
+            return entry["action"], bool(handlers[entry["action"]](entry))
+        except Exception as e:
+            logger.error(f"Failed to {entry['action']} channel {entry['channel_name']} ({entry['channel_id']}): {e}")
+            return entry["action"], False
+
+    for action, ok in scan_channels(plan.actions, run, workers):
+        done[action] += ok
+    return done
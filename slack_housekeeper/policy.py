@@ -0,0 +1,232 @@
+"""Inactivity thresholds per channel, loaded from a TOML or YAML policy file.
+
+    [defaults]
+    warn_after = "21d"
+    archive_after = "30d"
+    delete_archived_after = "90d"
+
+    [[rule]]                    # the first rule that matches a channel wins
+    prefix = ["proj-", "tmp-"]  # channel name prefixes
+    archive_after = "14d"       # thresholds a rule doesn't set come from [defaults]
+
+    [[rule]]
+    type = "shared"             # public, private or shared (Slack Connect)
+    keep = true                 # never warned about or archived
+
+    [[rule]]
+    min_members = 100           # and/or max_members
+    warn_after = "60d"
+    archive_after = "90d"
+
+Durations are numbers of days or strings like "36h", "2d" or "90m". Keys
+other than these are rejected, so a typo doesn't silently fall back to a
+default. The
+rules are compiled once: prefixes go into a trie, so picking a channel's
+thresholds costs one walk over its name however many rules there are, and
+the result is cached per (name, type, size bucket).
+"""
+import logging
+import re
+import threading
+from collections import namedtuple
+from datetime import timedelta
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WARN_AFTER = timedelta(days=21)
+DEFAULT_ARCHIVE_AFTER = timedelta(days=30)
+DEFAULT_DELETE_ARCHIVED_AFTER = timedelta(days=90)
+
+CHANNEL_TYPES = ("public", "private", "shared")
+
+THRESHOLDS = ("warn_after", "archive_after", "delete_archived_after")
+
+RULE_KEYS = ("name", "prefix", "type", "min_members", "max_members", "keep", *THRESHOLDS)
+
+Thresholds = namedtuple("Thresholds", ("warn_after", "archive_after", "delete_archived_after", "keep", "rule"))
+
+_DURATION = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([dhm]?)\s*$")
+_UNITS = {"d": "days", "": "days", "h": "hours", "m": "minutes"}
+
+# Marks the end of a prefix in the trie, holds the rules using that prefix
+_END = ""
+
+
+def parse_duration(value):
+    if isinstance(value, timedelta):
+        return value
+    if isinstance(value, (int, float)):
+        return timedelta(days=value)
+    match = _DURATION.match(str(value))
+    if not match:
+        raise ValueError(f"Invalid duration in policy: {value!r}")
+    return timedelta(**{_UNITS[match.group(2)]: float(match.group(1))})
+
+
+def channel_type(channel):
+    if channel.get("is_ext_shared") or channel.get("is_shared") or channel.get("is_org_shared"):
+        return "shared"
+    if channel.get("is_private"):
+        return "private"
+    return "public"
+
+
+def history_cutoff(thresholds, now):
+    """The Unix timestamp a channel's history is checked back to. A channel with nothing newer is
+    past both its warning and its archive threshold, so how much older its last message is doesn't matter."""
+    return now - max(thresholds.warn_after, thresholds.archive_after).total_seconds()
+
+
+def _check_keys(config, allowed, where):
+    unknown = set(config) - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown key in policy {where}: {', '.join(sorted(unknown))}")
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+class _Rule:
+    def __init__(self, index, config, defaults):
+        self.index = index
+        self.name = config.get("name", f"rule {index + 1}")
+        _check_keys(config, RULE_KEYS, self.name)
+        self.prefixes = [prefix.lstrip("#").lower() for prefix in _as_list(config.get("prefix"))]
+        self.types = set(_as_list(config.get("type")))
+        unknown = self.types - set(CHANNEL_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown channel type in policy {self.name}: {', '.join(sorted(unknown))}")
+        self.min_members = config.get("min_members")
+        self.max_members = config.get("max_members")
+        self.thresholds = Thresholds(
+            *(parse_duration(config[key]) if key in config else getattr(defaults, key) for key in THRESHOLDS),
+            keep=bool(config.get("keep", False)),
+            rule=self.name,
+        )
+
+    def matches(self, kind, members):
+        if self.types and kind not in self.types:
+            return False
+        if self.min_members is not None and (members is None or members < self.min_members):
+            return False
+        if self.max_members is not None and (members is None or members > self.max_members):
+            return False
+        return True
+
+
+class Policy:
+    """Compiled policy. thresholds(channel) picks the channel's Thresholds, decide() applies them."""
+
+    def __init__(self, config=None):
+        config = config or {}
+        _check_keys(config, ("defaults", "rule"), "file")
+        defaults = config.get("defaults", {})
+        _check_keys(defaults, THRESHOLDS, "defaults")
+        self.defaults = Thresholds(
+            parse_duration(defaults.get("warn_after", DEFAULT_WARN_AFTER)),
+            parse_duration(defaults.get("archive_after", DEFAULT_ARCHIVE_AFTER)),
+            parse_duration(defaults.get("delete_archived_after", DEFAULT_DELETE_ARCHIVED_AFTER)),
+            keep=False,
+            rule="defaults",
+        )
+        self.rules = [_Rule(index, rule, self.defaults) for index, rule in enumerate(config.get("rule", []))]
+
+        # Rules without a prefix are checked for every channel, the others only when the trie finds their prefix
+        self._unprefixed = [rule for rule in self.rules if not rule.prefixes]
+        self._prefixes = {}
+        for rule in self.rules:
+            for prefix in rule.prefixes:
+                node = self._prefixes
+                for char in prefix:
+                    node = node.setdefault(char, {})
+                node.setdefault(_END, []).append(rule)
+        # Size bounds used by any rule, so channels can be cached by which side of each they fall on
+        self._size_bounds = sorted({bound for rule in self.rules for bound in (rule.min_members, rule.max_members)
+                                    if bound is not None})
+        self._cache = {}
+        self._lock = threading.Lock()
+
+        all_thresholds = [self.defaults] + [rule.thresholds for rule in self.rules]
+        # The earliest anything can be warned about, e.g. for scanning an activity index
+        self.min_warn_after = min(thresholds.warn_after for thresholds in all_thresholds)
+
+    def _size_bucket(self, members):
+        # Counts bounds below and at-or-below, so sizes equal to a bound get a bucket of their own
+        if members is None:
+            return None
+        return sum(members >= bound for bound in self._size_bounds) + sum(members > bound for bound in self._size_bounds)
+
+    def _prefixed_rules(self, name):
+        rules = []
+        node = self._prefixes
+        rules.extend(node.get(_END, ()))
+        for char in name:
+            node = node.get(char)
+            if node is None:
+                break
+            rules.extend(node.get(_END, ()))
+        return rules
+
+    def thresholds(self, channel):
+        return self.thresholds_for(channel.get("name"), channel_type(channel), channel.get("num_members"))
+
+    def thresholds_for(self, name, kind, members):
+        """Like thresholds(), from the name, type ("public", "private" or "shared") and member count."""
+        name = (name or "").lower()
+        key = (name, kind, self._size_bucket(members))
+        thresholds = self._cache.get(key)
+        if thresholds is not None:
+            return thresholds
+
+        candidates = self._unprefixed + self._prefixed_rules(name) if self._prefixes else self._unprefixed
+        thresholds = self.defaults
+        for rule in sorted(candidates, key=lambda rule: rule.index):
+            if rule.matches(kind, members):
+                thresholds = rule.thresholds
+                break
+        with self._lock:
+            self._cache[key] = thresholds
+        return thresholds
+
+    def threshold_columns(self, names, kinds, members):
+        """warn_after and archive_after in seconds and keep, one entry per channel, for classify_inactivity()."""
+        warn_after, archive_after, keep = [], [], []
+        for name, kind, count in zip(names, kinds, members):
+            thresholds = self.thresholds_for(name, kind, count)
+            warn_after.append(thresholds.warn_after.total_seconds())
+            archive_after.append(thresholds.archive_after.total_seconds())
+            keep.append(thresholds.keep)
+        return warn_after, archive_after, keep
+
+    def decide(self, channel, inactivity):
+        """What to do with a channel that has been inactive for `inactivity`: "archive", "warn" or None."""
+        thresholds = self.thresholds(channel)
+        if thresholds.keep:
+            return None
+        if inactivity > thresholds.archive_after:
+            return "archive"
+        elif inactivity > thresholds.warn_after:
+            return "warn"
+        return None
+
+
+def load_policy(path):
+    """Reads a policy from a .toml, .yaml or .yml file."""
+    if str(path).endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError as e:
+            raise RuntimeError("Reading a YAML policy needs PyYAML, or use a .toml file") from e
+        with open(path) as f:
+            config = yaml.safe_load(f) or {}
+    else:
+        import tomllib
+
+        with open(path, "rb") as f:
+            config = tomllib.load(f)
+    policy = Policy(config)
+    logger.info(f"Loaded policy {path} with {len(policy.rules)} rules")
+    return policy
@@ -0,0 +1,49 @@
+"""Sorting channels out using only what conversations_list already returned, before any per-channel call.
+
+    dead        no members left, and the channel itself hasn't changed since
+                before the archive threshold: archived from list data, no
+                conversations_history call needed
+    unreadable  private channels the token isn't a member of, whose history
+                can't be read anyway
+    probe       everything else, checked with conversations_history
+
+Channels to probe are ordered by `updated`, least recently changed first, so
+the history budget goes to the channels most likely to be acted on before
+the ones that were touched recently.
+"""
+import time
+
+from slack_housekeeper.policy import channel_type
+
+DEAD = "dead"
+UNREADABLE = "unreadable"
+PROBE = "probe"
+
+
+def last_update(channel):
+    """When the channel itself last changed (`updated` is in milliseconds), or when it was created."""
+    updated = channel.get("updated")
+    if updated:
+        return updated / 1000
+    return float(channel.get("created") or 0)
+
+
+def classify(channel, policy, now=None):
+    now = time.time() if now is None else now
+    if channel.get("is_private") and channel.get("is_member") is False:
+        return UNREADABLE
+    # num_members doesn't count the other organisations' members of a shared channel
+    if (channel.get("num_members") == 0 and channel_type(channel) != "shared"
+            and now - last_update(channel) > policy.thresholds(channel).archive_after.total_seconds()):
+        return DEAD
+    return PROBE
+
+
+def prefilter(channels, policy, now=None):
+    """Splits channels into {"dead": [...], "unreadable": [...], "probe": [...]}, probes oldest first."""
+    now = time.time() if now is None else now
+    groups = {DEAD: [], UNREADABLE: [], PROBE: []}
+    for channel in channels:
+        groups[classify(channel, policy, now)].append(channel)
+    groups[PROBE].sort(key=last_update)
+    return groups
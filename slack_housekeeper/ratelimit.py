@@ -0,0 +1,175 @@
+"""Request scheduling for the Slack Web API: per-tier token buckets and Retry-After handling."""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Requests per minute allowed for each tier (https://api.slack.com/docs/rate-limits)
+TIER_LIMITS = {
+    1: 1,
+    2: 20,
+    3: 50,
+    4: 100,
+}
+
+# Tier of every WebClient method the housekeeper uses
+METHOD_TIERS = {
+    "conversations_list": 2,
+    "conversations_history": 2,
+    "conversations_info": 3,
+    "conversations_archive": 2,
+    "admin_conversations_delete": 2,
+    "chat_postMessage": 3,
+    "users_list": 2,
+}
+
+DEFAULT_TIER = 3
+
+# Used when Slack answers 429 without a Retry-After header
+DEFAULT_RETRY_AFTER = 1.0
+
+
+def retry_after(error):
+    """Seconds to wait before retrying, or None if the error isn't a rate limit."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+
+    status_code = getattr(response, "status_code", None)
+    code = response.get("error") if hasattr(response, "get") else None
+    if status_code != 429 and code != "ratelimited":
+        return None
+
+    headers = getattr(response, "headers", None) or {}
+    for name, value in headers.items():
+        if name.lower() == "retry-after":
+            try:
+                return float(value[0] if isinstance(value, list) else value)
+            except (TypeError, ValueError):
+                break
+    return DEFAULT_RETRY_AFTER
+
+
+class TokenBucket:
+    """Hands out `rate_per_minute` tokens a minute, allowing bursts of up to `burst`."""
+
+    def __init__(self, rate_per_minute, burst=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.blocked_until = 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Take one token, sleeping until one is available. Returns the time spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            self._sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        """Stop handing out tokens for `seconds`, e.g. after Slack asked us to back off."""
+        with self._lock:
+            now = self._clock()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            self.tokens = 0.0
+            self._updated = now
+
+
+class RequestScheduler:
+    """Keeps one token bucket per API method, sized by the method's tier.
+
+    Calls that come back with HTTP 429 pause their method's bucket for the
+    Retry-After period, so every worker backs off together, and are retried
+    up to `max_retries` times before the error is raised to the caller.
+    With `metrics` set, every call's latency, retries and waits are recorded.
+    """
+
+    def __init__(self, tiers=None, limits=None, bursts=None, max_retries=5, scale=1.0,
+                 clock=time.monotonic, sleep=time.sleep, metrics=None):
+        self.tiers = {**METHOD_TIERS, **(tiers or {})}
+        # `scale` multiplies every tier limit, for fake servers that run faster than Slack
+        self.limits = {tier: limit * scale for tier, limit in {**TIER_LIMITS, **(limits or {})}.items()}
+        # Small bursts keep the workers busy at the start of a run
+        self.bursts = bursts or {tier: max(1, int(limit // 10)) for tier, limit in self.limits.items()}
+        self.max_retries = max_retries
+        self.metrics = metrics
+        self._clock = clock
+        self._sleep = sleep
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, method):
+        with self._lock:
+            if method not in self._buckets:
+                tier = self.tiers.get(method, DEFAULT_TIER)
+                burst = max(1, self.bursts.get(tier, 1))
+                # The burst comes out of the per-minute allowance, so no 60 second
+                # window ever sees more than the tier limit
+                self._buckets[method] = TokenBucket(
+                    self.limits[tier] - burst + 1, burst, clock=self._clock, sleep=self._sleep
+                )
+            return self._buckets[method]
+
+    def call(self, method, fn, *args, **kwargs):
+        bucket = self.bucket(method)
+        attempt = 0
+        while True:
+            waited = bucket.acquire()
+            if self.metrics is not None:
+                self.metrics.record_wait(method, waited)
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if self.metrics is not None:
+                    self.metrics.record_call(method, time.perf_counter() - started, failed=True)
+                delay = retry_after(e)
+                if delay is None or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                if self.metrics is not None:
+                    self.metrics.record_retry(method)
+                logger.warning(f"{method} was rate limited, retrying in {delay:.1f}s (attempt {attempt})")
+                bucket.pause(delay)
+            else:
+                if self.metrics is not None:
+                    self.metrics.record_call(method, time.perf_counter() - started)
+                return result
+
+
+class RateLimitedClient:
+    """Wraps a WebClient so every API method call goes through a RequestScheduler.
+
+    The scheduler is shared, so any number of worker threads can use the same
+    client without going over the per-method limits together.
+    """
+
+    def __init__(self, client, scheduler=None):
+        self._client = client
+        self.scheduler = scheduler or RequestScheduler()
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            return self.scheduler.call(name, attr, *args, **kwargs)
+
+        return call
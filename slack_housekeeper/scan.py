@@ -0,0 +1,38 @@
+"""Concurrent per-channel processing that keeps results in the original order."""
+from concurrent.futures import ThreadPoolExecutor
+
+
+def scan_channels(channels, fn, workers=1):
+    if workers <= 1:
+        return [fn(channel) for channel in channels]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, channels))
+
+
+def iter_scan(pages, fn, workers=1):
+    """Like scan_channels over a stream of pages, yielding each page's results as soon as they're ready.
+
+    Only one page is in flight at a time, so the work and results pending
+    stay bounded by the page size no matter how many channels there are.
+    """
+    if workers <= 1:
+        for page in pages:
+            yield from map(fn, page)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for page in pages:
+            yield from pool.map(fn, page)
+
+
+def iter_scan_pages(pages, fn, workers=1):
+    """Like iter_scan, but yields each page's results as one list, for code that works on whole pages."""
+    if workers <= 1:
+        for page in pages:
+            yield [fn(channel) for channel in page]
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for page in pages:
+            yield list(pool.map(fn, page))
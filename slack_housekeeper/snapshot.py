@@ -0,0 +1,328 @@
+"""Columnar snapshots of every sweep, one row per channel, for looking back over months of runs.
+
+run() writes snapshot-<time>.parquet (or .arrow for Arrow IPC) to its snapshot
+directory. Without pyarrow it writes columnar JSON instead, which the queries
+read as well. The queries need pyarrow: all the snapshots are loaded into one
+table and scanned with pyarrow.compute, instead of re-parsing logs.
+
+    python -m slack_housekeeper.snapshot trending snapshots/ --days 7
+    python -m slack_housekeeper.snapshot histogram snapshots/ --months 6
+    python -m slack_housekeeper.snapshot replay snapshots/ --policy new-policy.toml
+"""
+import argparse
+import glob
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from slack_housekeeper.classifier import DECISIONS, classify_inactivity
+from slack_housekeeper.policy import channel_type, load_policy
+
+logger = logging.getLogger(__name__)
+
+# decision is "archive", "warn" or "none" for the active channels that were checked, "skip" for the
+# ones that weren't (whitelisted, kept by policy, unreadable), and "delete" or "archived" for archived ones.
+# last_ts is empty for channels archived because nothing was posted after the history cutoff, their last
+# activity is older than that but wasn't looked up
+FIELDS = ("channel_id", "name", "created", "creator", "last_ts", "num_members", "type", "decision",
+          "archive_after", "api_seconds")
+
+FORMATS = ("parquet", "arrow", "json")
+
+# Upper bounds, in days, of the inactivity histogram buckets
+INACTIVITY_BUCKETS = (7, 21, 30, 90)
+
+DAY = 86400
+
+
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("channel_id", pa.string()),
+        ("name", pa.string()),
+        ("created", pa.float64()),
+        ("creator", pa.string()),
+        ("last_ts", pa.float64()),
+        ("num_members", pa.int64()),
+        ("type", pa.string()),
+        ("decision", pa.string()),
+        ("archive_after", pa.float64()),
+        ("api_seconds", pa.float64()),
+    ])
+
+
+def _have_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _new_path(directory, stamp, format):
+    """A snapshot path nothing else has, created empty so a save running at the same time can't take it."""
+    for attempt in itertools.count():
+        path = os.path.join(directory, f"snapshot-{stamp}{f'-{attempt}' if attempt else ''}.{format}")
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            continue
+        return path
+
+
+class RunSnapshot:
+    """The rows of one sweep, added from any thread and written by save()."""
+
+    def __init__(self, taken_at=None):
+        self.taken_at = time.time() if taken_at is None else taken_at
+        self.columns = {field: [] for field in FIELDS}
+        self._lock = threading.Lock()
+
+    def add(self, channel, decision, last_ts=None, archive_after=None, api_seconds=0.0):
+        row = (
+            channel["id"],
+            channel.get("name"),
+            float(channel["created"]) if channel.get("created") else None,
+            channel.get("creator"),
+            float(last_ts) if last_ts else None,
+            channel.get("num_members"),
+            channel_type(channel),
+            decision,
+            archive_after.total_seconds() if archive_after is not None else None,
+            round(api_seconds, 6),
+        )
+        with self._lock:
+            for field, value in zip(FIELDS, row):
+                self.columns[field].append(value)
+
+    def __len__(self):
+        return len(self.columns["channel_id"])
+
+    def save(self, directory, format="parquet"):
+        """Writes the snapshot into `directory` and returns its path. Falls back to JSON without pyarrow."""
+        if format not in FORMATS:
+            raise ValueError(f"Unknown snapshot format: {format}")
+        if format != "json" and not _have_pyarrow():
+            logger.warning(f"pyarrow isn't installed, writing the snapshot as JSON instead of {format}")
+            format = "json"
+
+        os.makedirs(directory, exist_ok=True)
+        # Down to the microsecond, runs a second apart (or less) don't overwrite each other
+        path = _new_path(directory, datetime.fromtimestamp(self.taken_at).strftime("%Y%m%dT%H%M%S%f"), format)
+        if format == "json":
+            with open(path, "w") as f:
+                json.dump({"taken_at": self.taken_at, "columns": self.columns}, f)
+            return path
+
+        import pyarrow as pa
+
+        table = pa.table(self.columns, schema=_schema())
+        table = table.replace_schema_metadata({"taken_at": str(self.taken_at)})
+        if format == "parquet":
+            import pyarrow.parquet as pq
+
+            pq.write_table(table, path)
+        else:
+            import pyarrow.feather as feather
+
+            feather.write_feather(table, path, compression="zstd")
+        return path
+
+
+def load_snapshot(path):
+    """One snapshot as a pyarrow Table, with a taken_at column."""
+    import pyarrow as pa
+
+    if path.endswith(".json"):
+        with open(path) as f:
+            data = json.load(f)
+        table = pa.table(data["columns"])
+        taken_at = data["taken_at"]
+    else:
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+
+            table = pq.read_table(path)
+        else:
+            import pyarrow.feather as feather
+
+            table = feather.read_table(path)
+        taken_at = float(table.schema.metadata[b"taken_at"])
+        table = table.replace_schema_metadata(None)
+    schema = _schema()
+    for field in schema:
+        if field.name not in table.column_names:
+            # Written before the column was added
+            table = table.append_column(field.name, pa.nulls(len(table), field.type))
+    table = table.select(schema.names).cast(schema)
+    return table.append_column("taken_at", pa.array([taken_at] * len(table), pa.float64()))
+
+
+def load_snapshots(directory):
+    """Every snapshot in `directory` as one table."""
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise RuntimeError("Querying snapshots needs pyarrow") from e
+
+    paths = sorted(path for format in FORMATS for path in glob.glob(os.path.join(directory, f"snapshot-*.{format}")))
+    tables = [load_snapshot(path) for path in paths]
+    if not tables:
+        raise RuntimeError(f"No snapshots in {directory}")
+    return pa.concat_tables(tables)
+
+
+def trending(snapshots, days=7):
+    """Channels of the latest snapshot that will be archived within `days` unless someone posts,
+    and how many snapshots have shown them with that same last activity."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    taken_at = pc.max(snapshots["taken_at"])
+    latest = snapshots.filter(pc.and_(
+        pc.equal(snapshots["taken_at"], taken_at),
+        pc.is_in(snapshots["decision"], value_set=pa.array(["none", "warn"])),
+    ))
+    latest = latest.filter(pc.is_valid(latest["last_ts"]))
+    archive_at = pc.add(latest["last_ts"], latest["archive_after"])
+    days_left = pc.divide(pc.subtract(archive_at, taken_at), float(DAY))
+    latest = latest.append_column("days_left", pc.round(days_left, 1))
+    latest = latest.append_column(
+        "inactive_days", pc.round(pc.divide(pc.subtract(taken_at, latest["last_ts"]), float(DAY)), 1)
+    )
+    latest = latest.filter(pc.less_equal(latest["days_left"], days))
+
+    # Snapshots that saw the same last activity as the latest one
+    current = latest.select(["channel_id", "last_ts"]).rename_columns(["channel_id", "current_ts"])
+    seen = snapshots.select(["channel_id", "last_ts"]).join(current, "channel_id", join_type="inner")
+    quiet = seen.filter(pc.equal(seen["last_ts"], seen["current_ts"])).group_by("channel_id").aggregate(
+        [("last_ts", "count")]
+    )
+    quiet = pa.table({"channel_id": quiet["channel_id"], "quiet_snapshots": quiet["last_ts_count"]})
+    result = latest.join(quiet, "channel_id", join_type="left outer")
+    return result.select(["name", "days_left", "inactive_days", "quiet_snapshots", "decision", "creator"]).sort_by(
+        [("days_left", "ascending"), ("name", "ascending")]
+    )
+
+
+def bucket_labels():
+    bounds = (0,) + INACTIVITY_BUCKETS
+    return [f"{low}-{high}d" for low, high in zip(bounds, bounds[1:])] + [f"{bounds[-1]}d+", "past cutoff", "unknown"]
+
+
+def histogram(snapshots, separator="-", months=1):
+    """How long the active channels of each name prefix had been inactive, per month (latest snapshot of each).
+
+    Channels quiet since their history cutoff, whose exact inactivity isn't known, are counted as "past cutoff".
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    month = pc.strftime(pc.cast(pc.cast(pc.floor(snapshots["taken_at"]), pa.int64()), pa.timestamp("s")), format="%Y-%m")
+    snapshots = snapshots.append_column("month", month)
+    last_of_month = snapshots.group_by("month").aggregate([("taken_at", "max")])
+    wanted = last_of_month.sort_by([("month", "descending")]).slice(0, months)
+    rows = snapshots.filter(pc.and_(
+        pc.is_in(snapshots["taken_at"], value_set=wanted["taken_at_max"]),
+        pc.is_in(snapshots["decision"], value_set=pa.array(["none", "warn", "archive"])),
+    ))
+
+    prefix = pc.list_element(pc.split_pattern(pc.utf8_lower(pc.fill_null(rows["name"], "")), separator, max_splits=1), 0)
+    inactive_days = pc.divide(pc.subtract(rows["taken_at"], rows["last_ts"]), float(DAY))
+    labels = bucket_labels()
+    # Index of the first bucket bound the inactivity is below, the last of those if none,
+    # "past cutoff" or "unknown" if null
+    bucket = pa.array([0] * len(rows), pa.int64())
+    for bound in INACTIVITY_BUCKETS:
+        bucket = pc.add(bucket, pc.cast(pc.greater_equal(inactive_days, bound), pa.int64()))
+    unknown = pc.if_else(pc.equal(rows["decision"], "archive"), len(labels) - 2, len(labels) - 1)
+    bucket = pc.coalesce(bucket, pc.cast(unknown, pa.int64()))
+    counts = pa.table({"month": rows["month"], "prefix": prefix, "bucket": bucket}).group_by(
+        ["month", "prefix", "bucket"]
+    ).aggregate([("bucket", "count")])
+
+    table = {}
+    for month, prefix, bucket, count in zip(*(counts[column].to_pylist()
+                                              for column in ("month", "prefix", "bucket", "bucket_count"))):
+        table.setdefault((month, prefix), [0] * len(labels))[bucket] = count
+    return ["month", "prefix", *labels], [[month, prefix, *values] for (month, prefix), values in sorted(table.items())]
+
+
+def replay(snapshots, policy):
+    """What `policy` would have decided for the active channels of the latest snapshot, against what was
+    decided: a table of counts, one row per recorded decision and one column per replayed decision.
+
+    Channels quiet since their history cutoff are replayed as if their last activity was their archive
+    threshold before the snapshot, the least inactivity that got them archived.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    taken_at = pc.max(snapshots["taken_at"])
+    latest = snapshots.filter(pc.and_(
+        pc.equal(snapshots["taken_at"], taken_at),
+        pc.is_in(snapshots["decision"], value_set=pa.array(DECISIONS)),
+    ))
+    warn_after, archive_after, keep = policy.threshold_columns(
+        latest["name"].to_pylist(), [kind or "public" for kind in latest["type"].to_pylist()],
+        latest["num_members"].to_pylist(),
+    )
+    quiet = pc.and_(pc.is_null(latest["last_ts"]), pc.equal(latest["decision"], "archive"))
+    last_ts = pc.if_else(quiet, pc.subtract(taken_at, latest["archive_after"]), latest["last_ts"])
+    _, decisions, _ = classify_inactivity(
+        last_ts.to_numpy(zero_copy_only=False), latest["created"].to_numpy(zero_copy_only=False),
+        warn_after, archive_after, taken_at.as_py(),
+    )
+    replayed = ["keep" if kept else DECISIONS[decision] for decision, kept in zip(decisions, keep)]
+    counts = Counter(zip(latest["decision"].to_pylist(), replayed))
+
+    columns = [*DECISIONS, "keep"]
+    rows = [[recorded, *(counts[(recorded, column)] for column in columns)] for recorded in DECISIONS]
+    return ["recorded", *(f"now {column}" for column in columns)], rows
+
+
+def format_table(header, rows):
+    rows = [header] + [["" if value is None else str(value) for value in row] for row in rows]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    return ["  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip() for row in rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the snapshots written by the channel sweeps (needs pyarrow)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    trending_parser = commands.add_parser("trending", help="channels that will be archived soon unless someone posts")
+    trending_parser.add_argument("directory")
+    trending_parser.add_argument("--days", type=float, default=7, help="archived within this many days (default: 7)")
+    histogram_parser = commands.add_parser("histogram", help="inactivity of the active channels by name prefix")
+    histogram_parser.add_argument("directory")
+    histogram_parser.add_argument("--months", type=int, default=1, help="latest snapshot of each of the last N months")
+    histogram_parser.add_argument("--separator", default="-", help="ends the name prefix (default: -)")
+    replay_parser = commands.add_parser("replay", help="what another policy would decide for the latest snapshot")
+    replay_parser.add_argument("directory")
+    replay_parser.add_argument("--policy", required=True, help="policy file (.toml or .yaml)")
+    args = parser.parse_args(argv)
+
+    try:
+        snapshots = load_snapshots(args.directory)
+    except RuntimeError as e:
+        print(e)
+        return 2
+    if args.command == "trending":
+        result = trending(snapshots, args.days)
+        header, rows = result.column_names, [list(row.values()) for row in result.to_pylist()]
+    elif args.command == "histogram":
+        header, rows = histogram(snapshots, args.separator, args.months)
+    else:
+        header, rows = replay(snapshots, load_policy(args.policy))
+    print("\n".join(format_table(header, rows)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,176 @@
+"""Keep-alive HTTP transport for the Slack Web API.
+
+slack_sdk's WebClient opens a new urllib connection, with a new TLS
+handshake, for every request. PooledWebClient instead keeps a pool of
+persistent HTTPS connections that all scanning workers share, or one
+multiplexed HTTP/2 connection when httpx is installed and `http2=True`.
+It supports the WebClient methods the housekeeper calls: any method name
+maps to its Web API method (conversations_history -> conversations.history).
+"""
+import http.client
+import json
+import queue
+import select
+import ssl
+import threading
+from urllib.parse import urlencode, urlsplit
+
+from slack_housekeeper.api import ApiResponse, api_error
+
+DEFAULT_BASE_URL = "https://slack.com/api/"
+
+
+def _dropped(conn):
+    # An idle connection has nothing to read, unless the server has closed it
+    if conn.sock is None:
+        return True
+    try:
+        readable, _, _ = select.select([conn.sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    return bool(readable)
+
+
+class ConnectionPool:
+    """Up to `size` keep-alive connections to one host, handed out to one thread at a time."""
+
+    def __init__(self, base_url, size=8, timeout=30, keep_alive=True):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.connections_opened = 0
+        self._ssl_context = ssl.create_default_context() if self.scheme == "https" else None
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        with self._lock:
+            self.connections_opened += 1
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self._ssl_context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, body=None, headers=None):
+        """Sends one request and returns (status, headers, body)."""
+        with self._slots:
+            try:
+                conn, reused = self._idle.get_nowait(), True
+            except queue.Empty:
+                conn, reused = self._connect(), False
+            if reused and _dropped(conn):
+                conn.close()
+                conn, reused = self._connect(), False
+
+            while True:
+                sent = False
+                try:
+                    conn.request(method, path, body=body, headers=headers or {})
+                    sent = True
+                    response = conn.getresponse()
+                    data = response.read()
+                    break
+                except (http.client.HTTPException, OSError) as e:
+                    conn.close()
+                    # An idle connection the server has closed fails while sending, or gets no
+                    # answer at all; that's retried once on a fresh one. Anything else (e.g. a
+                    # timeout) may have reached Slack, and a chat.postMessage mustn't go out twice
+                    if sent:
+                        stale = isinstance(e, http.client.RemoteDisconnected)
+                    else:
+                        stale = isinstance(e, (BrokenPipeError, ConnectionResetError, ConnectionAbortedError))
+                    if not (reused and stale):
+                        raise
+                    conn, reused = self._connect(), False
+
+            if self.keep_alive and not response.will_close:
+                self._idle.put(conn)
+            else:
+                conn.close()
+            return response.status, dict(response.getheaders()), data
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class Http2Pool:
+    """The same interface on top of httpx, multiplexing all requests over HTTP/2."""
+
+    def __init__(self, base_url, size=8, timeout=30):
+        import httpx
+
+        parts = urlsplit(base_url)
+        self._origin = f"{parts.scheme}://{parts.netloc}"
+        self._client = httpx.Client(
+            http2=True, timeout=timeout, limits=httpx.Limits(max_connections=size, max_keepalive_connections=size)
+        )
+
+    def request(self, method, path, body=None, headers=None):
+        response = self._client.request(method, self._origin + path, content=body, headers=headers)
+        return response.status_code, dict(response.headers), response.content
+
+    def close(self):
+        self._client.close()
+
+
+def _form_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+
+class PooledWebClient:
+    """WebClient look-alike that sends every call through one shared connection pool."""
+
+    def __init__(self, token, base_url=DEFAULT_BASE_URL, pool_size=8, timeout=30, http2=False, keep_alive=True):
+        self.token = token
+        self.base_path = urlsplit(base_url).path.rstrip("/") + "/"
+        if http2:
+            self.pool = Http2Pool(base_url, pool_size, timeout)
+        else:
+            self.pool = ConnectionPool(base_url, pool_size, timeout, keep_alive=keep_alive)
+
+    def api_call(self, api_method, params=None):
+        # Bytes, so http.client sends headers and body in one packet
+        body = urlencode({key: _form_value(value) for key, value in (params or {}).items() if value is not None}).encode()
+        headers = {
+            "Authorization": f"Bearer {self.token}",
+            "Content-Type": "application/x-www-form-urlencoded",
+        }
+        status, response_headers, data = self.pool.request("POST", self.base_path + api_method, body, headers)
+
+        try:
+            payload = json.loads(data) if data else {}
+        except ValueError:
+            payload = {}
+        if status == 429:
+            payload = {"ok": False, "error": "ratelimited", **payload}
+        elif "ok" not in payload:
+            payload = {"ok": False, "error": f"http_{status}", **payload}
+
+        response = ApiResponse(payload, status_code=status, headers=response_headers)
+        if not response["ok"]:
+            raise api_error(response)
+        return response
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        api_method = name.replace("_", ".")
+
+        def call(**kwargs):
+            return self.api_call(api_method, kwargs)
+
+        return call
+
+    def close(self):
+        self.pool.close()
@@ -0,0 +1,112 @@
+"""Who can be sent a DM: the workspace's users, listed in bulk and kept on disk between runs."""
+import logging
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+
+from slack_housekeeper.api import api_errors
+
+logger = logging.getLogger(__name__)
+
+
+def is_notifiable(user):
+    # Guests (single and multi-channel) only see the channels they were invited to
+    return not (user["deleted"] or user["is_bot"] or user["is_guest"])
+
+
+class UserDirectory:
+    """SQLite snapshot of users.list, refreshed once it's older than `ttl`.
+
+    The snapshot is only taken the first time a user is looked up, so runs
+    that send no DMs make no users.list calls. A user missing from it (e.g.
+    one who joined after it was taken) counts as notifiable, like before.
+    """
+
+    def __init__(self, client, path, ttl=timedelta(hours=24), page_size=1000, team_id=None):
+        self.client = client
+        self.ttl = ttl
+        self.page_size = page_size
+        self.team_id = team_id
+        self._loaded = False
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                "id TEXT PRIMARY KEY, name TEXT, deleted INTEGER, is_bot INTEGER, is_guest INTEGER)"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS snapshot (taken_at REAL)")
+
+    def _taken_at(self):
+        row = self._db.execute("SELECT taken_at FROM snapshot").fetchone()
+        return row[0] if row else None
+
+    def _fetch(self):
+        users = []
+        cursor = None
+        kwargs = {"team_id": self.team_id} if self.team_id else {}
+        while True:
+            response = self.client.users_list(cursor=cursor, limit=self.page_size, **kwargs)
+            for member in response["members"]:
+                users.append((
+                    member["id"],
+                    member.get("name"),
+                    bool(member.get("deleted")),
+                    # Slackbot isn't flagged as a bot, but can't be sent a DM either
+                    bool(member.get("is_bot") or member["id"] == "USLACKBOT"),
+                    bool(member.get("is_restricted") or member.get("is_ultra_restricted")),
+                ))
+            cursor = response.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                return users
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            taken_at = self._taken_at()
+            if taken_at is None or time.time() - taken_at > self.ttl.total_seconds():
+                try:
+                    users = self._fetch()
+                except api_errors() as e:
+                    # An outdated snapshot is still better than none
+                    logger.error(f"Error listing users: {e.response['error']}")
+                else:
+                    with self._db:
+                        self._db.execute("DELETE FROM users")
+                        self._db.executemany("INSERT INTO users VALUES (?, ?, ?, ?, ?)", users)
+                        self._db.execute("DELETE FROM snapshot")
+                        self._db.execute("INSERT INTO snapshot VALUES (?)", (time.time(),))
+                    logger.info(f"Listed {len(users)} users")
+            self._loaded = True
+
+    def get(self, user_id):
+        self._ensure_loaded()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, name, deleted, is_bot, is_guest FROM users WHERE id = ?", (user_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "name": row[1], "deleted": bool(row[2]), "is_bot": bool(row[3]), "is_guest": bool(row[4])}
+
+    def can_notify(self, user_id):
+        if not user_id:
+            return False
+        user = self.get(user_id)
+        return user is None or is_notifiable(user)
+
+    def recipient(self, *candidates):
+        """The first of `candidates` (user ids, None for unknown) that can be sent a DM, or None."""
+        for user_id in candidates:
+            if self.can_notify(user_id):
+                return user_id
+        return None
+
+    def close(self):
+        with self._lock:
+            self._db.close()
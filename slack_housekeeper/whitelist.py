@@ -0,0 +1,131 @@
+"""Channel whitelist with constant-time lookups and automatic reloading.
+
+whitelist.txt holds one rule per line:
+
+    C01ABCDEF       channel id or name, matched exactly (names ignore case)
+    general
+    proj-*          every channel whose name starts with "proj-"
+    re:^team-\\d+$   regular expression searched in the channel name
+    # comment
+"""
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a prefix in the trie
+_END = ""
+
+
+class _Rules:
+    def __init__(self, lines):
+        self.exact = set()
+        self.names = set()
+        self.prefixes = {}
+        patterns = []
+        for line in lines:
+            rule = line.strip()
+            if not rule or rule.startswith("#"):
+                continue
+            if rule.startswith("re:"):
+                patterns.append(rule[3:])
+            elif rule.endswith("*"):
+                self._add_prefix(rule[:-1].lstrip("#").lower())
+            else:
+                self.exact.add(rule)
+                self.names.add(rule.lstrip("#").lower())
+        self.pattern = self._compile(patterns)
+
+    def _add_prefix(self, prefix):
+        node = self.prefixes
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[_END] = True
+
+    def _compile(self, patterns):
+        valid = []
+        for pattern in patterns:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                logger.error(f"Ignoring invalid whitelist pattern {pattern!r}: {e}")
+                continue
+            valid.append(f"(?:{pattern})")
+        # One combined regex, so a name is scanned once however many patterns there are
+        return re.compile("|".join(valid), re.IGNORECASE) if valid else None
+
+    def has_prefix(self, name):
+        node = self.prefixes
+        if _END in node:
+            return True
+        for char in name:
+            node = node.get(char)
+            if node is None:
+                return False
+            if _END in node:
+                return True
+        return False
+
+    def matches(self, channel_id, name):
+        if channel_id in self.exact:
+            return True
+        if not name:
+            return False
+        name = name.lower()
+        if name in self.names or self.has_prefix(name):
+            return True
+        return self.pattern is not None and self.pattern.search(name) is not None
+
+
+class Whitelist:
+    """Compiled whitelist.txt, reloaded when the file changes on disk.
+
+    The file is checked at most once every `check_interval` seconds, so a
+    long-running process picks up edits without a restart.
+    """
+
+    def __init__(self, path="whitelist.txt", check_interval=5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._stamp = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._rules = _Rules([])
+        self.reload()
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def reload(self):
+        stamp = self._file_stamp()
+        try:
+            with open(self.path, "r") as f:
+                rules = _Rules(f)
+        except FileNotFoundError:
+            logger.warning("Whitelist file not found, using empty whitelist")
+            rules = _Rules([])
+        self._rules = rules
+        self._stamp = stamp
+        self._checked_at = time.monotonic()
+
+    def reload_if_changed(self):
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.check_interval:
+                return False
+            self._checked_at = time.monotonic()
+            if self._file_stamp() == self._stamp:
+                return False
+            logger.info(f"{self.path} changed, reloading whitelist")
+            self.reload()
+            return True
+
+    def matches(self, channel):
+        self.reload_if_changed()
+        return self._rules.matches(channel.get("id"), channel.get("name"))
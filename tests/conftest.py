@@ -0,0 +1,30 @@
+"""Fixtures shared by the tests that run a Housekeeper against a FakeSlack."""
+import pytest
+
+from slack_housekeeper.housekeeper import Housekeeper
+
+
+@pytest.fixture
+def make_housekeeper(tmp_path):
+    """Builds Housekeepers for a FakeSlack, keeping their caches and whitelist in tmp_path.
+    Keyword arguments override the defaults, and everything built is closed after the test."""
+    built = []
+
+    def make(slack, **kwargs):
+        settings = {
+            "client": slack,
+            "scan_workers": 2,
+            "rate_limit_scale": 1000,
+            "digest": False,
+            "activity_cache_path": str(tmp_path / "activity.sqlite"),
+            "user_cache_path": str(tmp_path / "users.sqlite"),
+            "whitelist_path": str(tmp_path / "whitelist.txt"),
+            **kwargs,
+        }
+        housekeeper = Housekeeper(**settings)
+        built.append(housekeeper)
+        return housekeeper
+
+    yield make
+    for housekeeper in built:
+        housekeeper.close()
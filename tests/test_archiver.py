@@ -0,0 +1,67 @@
+"""Channels archived concurrently, each one's notice still posted before its archive."""
+import threading
+import time
+
+from slack_housekeeper.archiver import ArchiveExecutor, format_results
+from slack_housekeeper.fakeslack import FakeSlack
+
+
+def test_every_channel_is_notified_then_archived():
+    slack = FakeSlack()
+    for i in range(20):
+        slack.add_channel(f"C{i}", f"channel-{i}")
+    order = []
+    lock = threading.Lock()
+
+    def notify(channel):
+        slack.chat_postMessage(channel=channel["id"], text="Archiving")
+        with lock:
+            order.append(("notify", channel["id"]))
+        return True
+
+    def archive(channel):
+        time.sleep(0.001)
+        slack.conversations_archive(channel=channel["id"])
+        with lock:
+            order.append(("archive", channel["id"]))
+        return True
+
+    executor = ArchiveExecutor(archive, notify=notify, workers=4)
+    for channel in list(slack.channels.values()):
+        executor.submit(channel)
+    results = executor.results()
+
+    assert [result["channel_id"] for result in results] == [f"C{i}" for i in range(20)]
+    assert all(result["notified"] and result["archived"] for result in results)
+    for i in range(20):
+        assert order.index(("notify", f"C{i}")) < order.index(("archive", f"C{i}"))
+    # Posted before the archive, so none was refused
+    assert len(slack.posted) == 20
+
+
+def test_failures_are_reported_per_channel():
+    slack = FakeSlack()
+    slack.add_channel("C1", "fine")
+    slack.add_channel("C2", "gone")
+    slack.add_channel("C3", "archived-already", is_archived=True)
+    del slack.channels["C2"]
+
+    def notify(channel):
+        return slack.chat_postMessage(channel=channel["id"], text="Archiving")["ok"]
+
+    def archive(channel):
+        return slack.conversations_archive(channel=channel["id"])["ok"]
+
+    executor = ArchiveExecutor(archive, notify=notify, workers=2)
+    for channel_id, name in (("C1", "fine"), ("C2", "gone"), ("C3", "archived-already")):
+        executor.submit({"id": channel_id, "name": name})
+    fine, gone, archived = executor.results()
+
+    assert (fine["notified"], fine["archived"], fine["error"]) == (True, True, None)
+    assert (gone["archived"], gone["error"]) == (False, "channel_not_found")
+    # A failed notice doesn't stop the archive, whose own error is what's reported
+    assert (archived["notified"], archived["archived"], archived["error"]) == (False, False, "already_archived")
+
+    table = format_results([fine, gone])
+    assert table[0].split() == ["channel_id", "channel_name", "notified", "archived", "error"]
+    assert table[2].split() == ["C2", "gone", "False", "False", "channel_not_found"]
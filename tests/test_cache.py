@@ -0,0 +1,58 @@
+"""The activity cache kept between runs."""
+import time
+from datetime import timedelta
+
+import pytest
+
+from slack_housekeeper.cache import ActivityCache
+from slack_housekeeper.fakeslack import FakeSlack
+
+DAY = 86400
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ActivityCache(str(tmp_path / "activity.sqlite"))
+    yield cache
+    cache.close()
+
+
+def test_last_ts_only_moves_forward(cache):
+    cache.update("C1", last_ts=100.0, creator="U1", created=10.0)
+    cache.update("C1", last_ts=50.0)
+    assert cache.get("C1")["last_ts"] == 100.0
+    # Missing values keep what was cached
+    cache.update("C1", last_ts=None, creator=None)
+    assert (cache.get("C1")["last_ts"], cache.get("C1")["creator"], cache.get("C1")["created"]) == (100.0, "U1", 10.0)
+    cache.update("C1", last_ts=200.0)
+    assert cache.get("C1")["last_ts"] == 200.0
+
+
+def test_last_ts_is_fresh_until_the_channel_could_be_warned_by_the_next_run(cache):
+    now = 1_000_000.0
+    cache.update("C1", last_ts=now - 10 * DAY)
+    warn_after = timedelta(days=21)
+    assert cache.last_ts_if_fresh("C1", warn_after, timedelta(days=1), now=now) == now - 10 * DAY
+    assert cache.last_ts_if_fresh("C1", warn_after, timedelta(days=11), now=now) is None
+    assert cache.last_ts_if_fresh("C2", warn_after, timedelta(days=1), now=now) is None
+
+
+def test_warnings_and_archives_are_recorded(cache):
+    assert cache.warned_at("C1") is None and cache.archived_at("C1") is None
+    cache.mark_warned("C1", "U1", warned_at=5.0)
+    cache.mark_archived("C1", archived_at=7.0)
+    assert (cache.warned_at("C1"), cache.archived_at("C1")) == (5.0, 7.0)
+
+
+def test_recently_active_channels_are_not_checked_again(make_housekeeper):
+    now = time.time()
+    slack = FakeSlack()
+    slack.add_channel("C1", "busy", creator="U1", created=now - 100 * DAY, last_message_ts=now - DAY)
+    slack.add_channel("C2", "idle", creator="U1", created=now - 100 * DAY, last_message_ts=now - 20 * DAY)
+    slack.add_user("U1")
+
+    make_housekeeper(slack).run()
+    assert slack.calls["conversations_history"] == 2
+    # C1 can't reach 21 days before the next run, C2 can
+    make_housekeeper(slack).run()
+    assert slack.calls["conversations_history"] == 3
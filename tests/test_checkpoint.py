@@ -0,0 +1,79 @@
+"""Interrupted sweeps picked up by the next run."""
+import time
+from datetime import timedelta
+
+import pytest
+
+from slack_housekeeper.checkpoint import SweepCheckpoint
+from slack_housekeeper.fakeslack import FakeSlack
+
+DAY = 86400
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    checkpoint = SweepCheckpoint(str(tmp_path / "checkpoint.sqlite"))
+    yield checkpoint
+    checkpoint.close()
+
+
+def test_unfinished_sweeps_are_resumed_until_they_are_too_old(checkpoint):
+    assert not checkpoint.begin(timedelta(hours=1), now=1000.0)
+    checkpoint.mark("C1", "history", [123.0, None])
+    assert checkpoint.begin(timedelta(hours=1), now=2000.0)
+    assert checkpoint.result("C1", "history") == [123.0, None]
+
+    # Older than max_age, a new sweep starts from scratch
+    assert not checkpoint.begin(timedelta(hours=1), now=1000.0 + 7200)
+    assert not checkpoint.done("C1", "history")
+
+    checkpoint.mark("C1", "archive")
+    checkpoint.finish()
+    assert not checkpoint.done("C1", "archive")
+
+
+def test_listing_resumes_from_the_saved_cursor(checkpoint):
+    slack = FakeSlack(page_size=2)
+    for i in range(5):
+        slack.add_channel(f"C{i}", f"channel-{i}")
+    checkpoint.begin(timedelta(hours=1))
+
+    pages = checkpoint.iter_pages(slack)
+    assert [c["id"] for c in next(pages)] == ["C0", "C1"]
+    pages.close()
+    assert not checkpoint.listed
+
+    # The stored page is replayed, only the rest is fetched
+    channels = [c["id"] for page in checkpoint.iter_pages(slack) for c in page]
+    assert channels == ["C0", "C1", "C2", "C3", "C4"]
+    assert slack.calls["conversations_list"] == 3
+    assert checkpoint.listed
+
+
+def test_an_interrupted_run_is_finished_without_repeating_itself(make_housekeeper, tmp_path):
+    now = time.time()
+    slack = FakeSlack()
+    slack.add_channel("C1", "idle", creator="U1", created=now - 100 * DAY, last_message_ts=now - 25 * DAY)
+    slack.add_channel("C2", "quiet", creator="U1", created=now - 100 * DAY, last_message_ts=now - 40 * DAY)
+    slack.add_user("U1")
+    checkpoint_path = str(tmp_path / "checkpoint.sqlite")
+
+    def killed():
+        raise KeyboardInterrupt
+
+    crashing = make_housekeeper(slack, checkpoint_path=checkpoint_path)
+    # Killed after the scan and the archives, before the warnings went out
+    crashing.flush_creator_notices = killed
+    with pytest.raises(KeyboardInterrupt):
+        crashing.run()
+    crashing.close()
+    calls = dict(slack.calls)
+    assert slack.channels["C2"]["is_archived"]
+
+    summary = make_housekeeper(slack, checkpoint_path=checkpoint_path).run()
+
+    assert summary["archived"] == 1 and summary["warned"] == 1
+    # Neither the history nor the archive calls were made again
+    assert slack.calls["conversations_history"] == calls["conversations_history"]
+    assert slack.calls["conversations_archive"] == calls["conversations_archive"] == 1
+    assert len([message for message in slack.posted if message["channel"] == "U1"]) == 1
@@ -0,0 +1,39 @@
+"""classify_inactivity() with and without numpy."""
+import math
+import sys
+
+import pytest
+
+from slack_housekeeper.classifier import ARCHIVE, NONE, WARN, _classify_python, classify_inactivity
+
+NOW = 1_000_000.0
+DAY = 86400.0
+
+# last_ts, created: known, None and NaN in both columns
+LAST_TS = [NOW - 40 * DAY, NOW - 25 * DAY, None, math.nan, None, math.nan, NOW - DAY]
+CREATED = [NOW - 100 * DAY, NOW - 100 * DAY, NOW - 35 * DAY, NOW - 22 * DAY, None, math.nan, math.nan]
+WARN_AFTER = [21 * DAY] * 6 + [0.5 * DAY]
+EXPECTED = [ARCHIVE, WARN, ARCHIVE, WARN, NONE, NONE, WARN]
+
+
+def same(left, right):
+    return [round(value, 6) if not math.isnan(value) else "nan" for value in left] == \
+        [round(value, 6) if not math.isnan(value) else "nan" for value in right]
+
+
+def test_without_numpy(monkeypatch):
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    inactive, decisions, remaining = classify_inactivity(LAST_TS, CREATED, WARN_AFTER, 30 * DAY, NOW)
+    assert list(decisions) == EXPECTED
+    assert inactive[2] == 35 * DAY
+    assert math.isnan(inactive[4]) and math.isnan(remaining[5])
+
+
+def test_numpy_and_python_agree():
+    pytest.importorskip("numpy")
+    fast = classify_inactivity(LAST_TS, CREATED, WARN_AFTER, 30 * DAY, NOW)
+    slow = _classify_python(LAST_TS, CREATED, WARN_AFTER, 30 * DAY, NOW)
+
+    assert list(fast[1]) == list(slow[1]) == EXPECTED
+    assert same(list(fast[0]), slow[0])
+    assert same(list(fast[2]), slow[2])
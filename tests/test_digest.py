@@ -0,0 +1,43 @@
+"""#housekeeping notices batched into one digest per run."""
+from slack_housekeeper.digest import MESSAGE_BLOCKS, SECTION_CHARS, HousekeepingDigest
+from slack_housekeeper.fakeslack import FakeSlack
+
+
+def test_nothing_is_posted_without_events():
+    slack = FakeSlack()
+    assert HousekeepingDigest(slack).flush() == 0
+    assert slack.posted == []
+
+
+def test_details_are_threaded_under_one_summary():
+    slack = FakeSlack()
+    digest = HousekeepingDigest(slack)
+    digest.add("archived", "old", "archived after 40 days")
+    digest.add("inactive", "quiet", "archived in 5 days")
+    digest.add("archived", "older", "archived after 90 days")
+
+    assert digest.flush() == 2
+    summary, details = slack.posted
+    assert summary["channel"] == "#housekeeping" and summary["thread_ts"] is None
+    assert summary["text"] == "Autoarchive Notice: 2 archived, 1 inactive"
+    assert details["thread_ts"] == summary["ts"]
+    assert "#quiet: archived in 5 days" in details["blocks"][0]["text"]["text"]
+    # Flushed events aren't posted again
+    assert digest.flush() == 0
+
+
+def test_long_digests_are_split_within_slack_limits():
+    slack = FakeSlack()
+    digest = HousekeepingDigest(slack, threaded=False)
+    for i in range(2000):
+        digest.add("archived", f"channel-{i}", "x" * 100)
+
+    messages = digest.flush()
+
+    details = slack.posted[1:]
+    assert messages == 1 + len(details) > 2
+    assert all(message["thread_ts"] is None for message in details)
+    assert all(len(message["blocks"]) <= MESSAGE_BLOCKS for message in details)
+    sections = [block["text"]["text"] for message in details for block in message["blocks"]]
+    assert all(len(section) <= SECTION_CHARS for section in sections)
+    assert sum(section.count("• ") for section in sections) == 2000
@@ -0,0 +1,83 @@
+"""The event-driven activity index, and sweeps over recorded events."""
+import json
+import time
+from datetime import timedelta
+
+import pytest
+
+from slack_housekeeper import cli
+from slack_housekeeper.cache import ActivityCache
+from slack_housekeeper.events import ActivityIndex, fake_workspace, iter_events, replay_events
+
+DAY = 86400
+
+
+def test_the_index_follows_channel_events(tmp_path):
+    cache = ActivityCache(str(tmp_path / "activity.sqlite"))
+    index = ActivityIndex(cache)
+    index.apply({"type": "channel_created", "channel": {"id": "C1", "name": "new", "created": 1000}})
+    index.apply({"type": "message", "channel": "C1", "ts": "2000.5"})
+    # Out of order deliveries don't move the last activity back
+    index.apply({"type": "message", "channel": "C1", "ts": "1500"})
+    assert index.get("C1")["last_ts"] == 2000.5
+    assert not index.apply({"type": "reaction_added"})
+
+    index.apply({"type": "channel_archive", "channel": "C1"})
+    assert list(index.inactive(timedelta(0), now=3000)) == []
+    index.apply({"type": "channel_unarchive", "channel": "C1", "event_ts": "2500"})
+    [(entry, inactivity)] = index.inactive(timedelta(0), now=3000)
+    assert (entry["id"], inactivity) == ("C1", 500)
+
+    assert index.flush() == 1
+    assert cache.get("C1")["last_ts"] == 2500
+    assert index.flush() == 0
+    cache.close()
+
+
+def test_recorded_events_can_be_envelopes_or_bare_events():
+    lines = ['{"event": {"type": "message", "channel": "C1", "ts": "1"}}', "", '{"type": "channel_archive", "channel": "C1"}']
+    assert [event["type"] for event in iter_events(lines)] == ["message", "channel_archive"]
+
+
+@pytest.fixture
+def recording(tmp_path):
+    now = time.time()
+    events = [
+        {"type": "channel_created", "channel": {"id": "C1", "name": "quiet", "creator": "U1", "created": now - 100 * DAY}},
+        {"type": "channel_created", "channel": {"id": "C2", "name": "idle", "creator": "U1", "created": now - 100 * DAY}},
+        {"type": "channel_created", "channel": {"id": "C3", "name": "busy", "creator": "U1", "created": now - 100 * DAY}},
+        {"event": {"type": "message", "channel": "C1", "user": "U1", "ts": f"{now - 40 * DAY:.6f}"}},
+        {"event": {"type": "message", "channel": "C2", "user": "U1", "ts": f"{now - 25 * DAY:.6f}"}},
+        {"event": {"type": "message", "channel": "C3", "user": "U1", "ts": f"{now - DAY:.6f}"}},
+    ]
+    path = tmp_path / "events.jsonl"
+    path.write_text("\n".join(json.dumps(event) for event in events) + "\n")
+    return str(path)
+
+
+def test_replays_only_act_on_the_fake_workspace(recording, make_housekeeper):
+    slack = fake_workspace(recording)
+    assert set(slack.channels) == {"C1", "C2", "C3"}
+    slack.add_user("U1", name="creator")
+
+    make_housekeeper(slack).replay(recording)
+
+    assert slack.channels["C1"]["is_archived"]
+    assert not slack.channels["C2"]["is_archived"] and not slack.channels["C3"]["is_archived"]
+    [warning] = [message for message in slack.posted if message["channel"] == "U1"]
+    assert "#idle" in warning["text"] and "#busy" not in warning["text"]
+
+
+def test_replays_refuse_a_client_that_talks_to_slack(recording, make_housekeeper):
+    class LiveClient:
+        pass
+
+    with pytest.raises(ValueError):
+        make_housekeeper(LiveClient()).replay(recording)
+    assert replay_events(recording, ActivityIndex()) == 6
+
+
+def test_the_replay_command_refuses_to_run_with_a_token(recording, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    assert cli.replay(recording, {"SLACK_API_TOKEN": "xoxb-real"}) == 2
+    assert cli.replay(recording, {}) == 0
@@ -0,0 +1,18 @@
+"""Several workspaces swept side by side."""
+from slack_housekeeper.fakeslack import FakeSlack
+from slack_housekeeper.fleet import run_fleet
+
+
+def test_a_workspace_that_cant_be_set_up_is_reported_as_failed(tmp_path):
+    working = {
+        "name": "working", "client": FakeSlack(), "rate_limit_scale": 1000, "digest": False,
+        "activity_cache_path": str(tmp_path / "activity.sqlite"), "user_cache_path": str(tmp_path / "users.sqlite"),
+        "whitelist_path": str(tmp_path / "whitelist.txt"),
+    }
+    broken = {**working, "name": "broken", "scan_wokers": 4}
+
+    results = run_fleet([broken, working], concurrency=2)
+
+    assert [result["workspace"] for result in results] == ["broken", "working"]
+    assert "scan_wokers" in results[0]["error"]
+    assert "error" not in results[1]
@@ -0,0 +1,91 @@
+"""Full sweeps by a Housekeeper against a FakeSlack."""
+import logging
+import time
+
+import pytest
+
+from slack_housekeeper.fakeslack import FakeSlack
+from slack_housekeeper.housekeeper import Housekeeper
+
+DAY = 86400
+
+
+@pytest.fixture
+def slack():
+    now = time.time()
+    slack = FakeSlack()
+    slack.add_channel("C1", "idle", creator="U1", created=now - 100 * DAY, last_message_ts=now - 25 * DAY)
+    slack.add_channel("C2", "idle-too", creator="U1", created=now - 100 * DAY, last_message_ts=now - 24 * DAY)
+    slack.add_channel("C3", "orphaned", creator="U2", created=now - 100 * DAY, last_message_ts=now - 23 * DAY)
+    slack.add_user("U1")
+    slack.add_user("U2", deleted=True)
+    return slack
+
+
+def sweep(make_housekeeper, slack, **kwargs):
+    housekeeper = make_housekeeper(slack, **kwargs)
+    try:
+        return housekeeper.run()
+    finally:
+        housekeeper.close()
+
+
+def direct_messages(slack):
+    return [message for message in slack.posted if message["channel"].startswith("U")]
+
+
+def test_warnings_are_only_counted_when_sent(slack, make_housekeeper):
+    # C3's creator is deactivated and its last poster is the same user, so there's nobody to warn
+    slack.messages["C3"][-1]["user"] = "U2"
+
+    first = sweep(make_housekeeper, slack)
+    assert (first["warned"], first["warn_skipped"]) == (2, 1)
+    assert len(direct_messages(slack)) == 1
+
+    # Nothing has changed, so nobody is warned again
+    second = sweep(make_housekeeper, slack)
+    assert (second["warned"], second["warn_skipped"]) == (0, 3)
+    assert len(direct_messages(slack)) == 1
+
+
+def test_archived_channels_are_deleted_counting_from_the_archive(slack, make_housekeeper):
+    now = time.time()
+    slack.add_channel("C4", "archived-long-ago", created=now - 400 * DAY, is_archived=True,
+                      updated=int((now - 100 * DAY) * 1000))
+    slack.add_channel("C5", "archived-last-week", created=now - 400 * DAY, is_archived=True,
+                      updated=int((now - 7 * DAY) * 1000))
+
+    # Deleting needs an org admin token, so it's off unless asked for
+    assert sweep(make_housekeeper, slack)["deleted"] == 0
+    assert sweep(make_housekeeper, slack, delete_archived=True)["deleted"] == 1
+    assert "C4" not in slack.channels and "C5" in slack.channels
+
+
+def test_a_failed_delete_only_costs_that_channel(slack, make_housekeeper):
+    now = time.time()
+    for channel_id in ("C4", "C5"):
+        slack.add_channel(channel_id, f"archived-{channel_id}", created=now - 200 * DAY, is_archived=True)
+    admin_conversations_delete = slack.admin_conversations_delete
+
+    def delete(channel_id, **kwargs):
+        if channel_id == "C4":
+            raise slack._fail("not_allowed_token_type")
+        return admin_conversations_delete(channel_id, **kwargs)
+
+    slack.admin_conversations_delete = delete
+    summary = sweep(make_housekeeper, slack, delete_archived=True)
+    assert (summary["deleted"], summary["delete_failed"]) == (1, 1)
+    # The inactivity sweep still ran
+    assert summary["warned"] == 3
+
+
+def test_creating_a_housekeeper_has_no_side_effects(tmp_path, caplog):
+    with caplog.at_level(logging.DEBUG):
+        housekeeper = Housekeeper(
+            token="xoxp-test", activity_cache_path=str(tmp_path / "activity.sqlite"),
+            user_cache_path=str(tmp_path / "users.sqlite"), whitelist_path=str(tmp_path / "whitelist.txt"),
+        )
+        housekeeper.close()
+    # Not even the missing whitelist is looked at yet
+    assert not caplog.records
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,71 @@
+"""API call metrics and their Prometheus export."""
+import threading
+
+from slack_housekeeper.fakeslack import FakeSlack
+from slack_housekeeper.metrics import Metrics
+from slack_housekeeper.ratelimit import RateLimitedClient, RequestScheduler
+
+
+def series(text):
+    """{series with labels: value} for the sample lines of a textfile."""
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if line and not line.startswith("#"))
+
+
+def test_calls_are_counted_under_the_callers_phase():
+    metrics = Metrics()
+    slack = FakeSlack()
+    slack.add_channel("C1", "general")
+    client = RateLimitedClient(slack, RequestScheduler(scale=1000, metrics=metrics))
+
+    with metrics.phase("history_fetching"):
+        client.conversations_history(channel="C1")
+        # Work handed to another thread stays in the phase it was handed over from
+        worker = threading.Thread(target=metrics.bind(lambda: client.conversations_info(channel="C1")))
+        worker.start()
+        worker.join()
+    client.conversations_list()
+
+    assert metrics.calls == {
+        ("history_fetching", "conversations_history"): 1,
+        ("history_fetching", "conversations_info"): 1,
+        ("other", "conversations_list"): 1,
+    }
+    assert metrics.thread_api_seconds() > 0
+
+
+def test_textfile_has_counters_and_a_cumulative_histogram(tmp_path):
+    metrics = Metrics(labels={"workspace": "eng"})
+    with metrics.phase("archive"):
+        metrics.record_call("conversations_archive", 0.2)
+        metrics.record_call("conversations_archive", 3.0, failed=True)
+        metrics.record_retry("conversations_archive")
+        metrics.record_wait("conversations_archive", 1.5)
+
+    path = tmp_path / "slack_housekeeper.prom"
+    metrics.write_textfile(str(path))
+    assert [p.name for p in tmp_path.iterdir()] == [path.name]
+
+    values = series(path.read_text())
+    labels = 'workspace="eng",phase="archive",method="conversations_archive"'
+    assert values[f"slack_housekeeper_api_calls_total{{{labels}}}"] == "2"
+    assert values[f"slack_housekeeper_api_errors_total{{{labels}}}"] == "1"
+    assert values[f"slack_housekeeper_api_retries_total{{{labels}}}"] == "1"
+    assert float(values[f"slack_housekeeper_ratelimit_wait_seconds_total{{{labels}}}"]) == 1.5
+    assert values[f'slack_housekeeper_api_call_duration_seconds_bucket{{{labels},le="0.1"}}'] == "0"
+    assert values[f'slack_housekeeper_api_call_duration_seconds_bucket{{{labels},le="0.25"}}'] == "1"
+    assert values[f'slack_housekeeper_api_call_duration_seconds_bucket{{{labels},le="5.0"}}'] == "2"
+    assert values[f'slack_housekeeper_api_call_duration_seconds_bucket{{{labels},le="+Inf"}}'] == "2"
+    assert float(values[f"slack_housekeeper_api_call_duration_seconds_sum{{{labels}}}"]) == 3.2
+    assert 'slack_housekeeper_phase_seconds_total{workspace="eng",phase="archive"}' in values
+
+
+def test_summary_has_a_line_per_phase():
+    metrics = Metrics()
+    with metrics.phase("archive"):
+        metrics.record_call("conversations_archive", 0.004)
+        metrics.record_retry("conversations_archive")
+
+    lines = metrics.summary()
+    assert lines[0].startswith("Run took ")
+    assert lines[1].startswith("archive: ")
+    assert "1 calls (mean 4ms), 1 retries" in lines[1]
@@ -0,0 +1,73 @@
+"""Plans built and applied by a Housekeeper against a FakeSlack."""
+import time
+
+import pytest
+
+from slack_housekeeper.fakeslack import FakeSlack
+from slack_housekeeper.plan import Plan
+from slack_housekeeper.policy import Policy
+
+DAY = 86400
+
+
+@pytest.fixture
+def slack():
+    now = time.time()
+    slack = FakeSlack()
+    for channel_id, name, days in (("C1", "quiet", 40), ("C2", "gone", 40), ("C3", "revived", 40), ("C4", "idle", 25)):
+        slack.add_channel(channel_id, name, creator="U1", created=now - 100 * DAY, last_message_ts=now - days * DAY)
+    slack.add_user("U1")
+    return slack
+
+
+@pytest.fixture
+def housekeeper(slack, make_housekeeper):
+    return make_housekeeper(slack, scan_workers=1)
+
+
+def test_apply_plan_reports_what_was_done(slack, housekeeper, tmp_path):
+    housekeeper.plan(str(tmp_path / "plan.json"))
+    plan = Plan.load(str(tmp_path / "plan.json"))
+    assert plan.counts() == {"warn": 1, "archive": 3, "delete": 0}
+
+    # Between planning and applying, one channel is deleted and another gets a message
+    del slack.channels["C2"]
+    slack.add_message("C3", time.time())
+
+    done = housekeeper.apply_plan(plan)
+
+    assert done == {"warn": 1, "archive": 1, "delete": 0}
+    assert slack.channels["C1"]["is_archived"]
+    assert not slack.channels["C3"]["is_archived"]
+
+
+def test_quiet_channels_are_planned_without_a_last_activity(housekeeper, tmp_path):
+    plan = housekeeper.plan(str(tmp_path / "plan.json"))
+
+    entries = {entry["channel_id"]: entry for entry in plan.actions}
+    # Nothing since the 30 day cutoff, the 100 day old creation date isn't its last activity
+    assert entries["C1"]["reason"] == "inactive for more than 30 days"
+    assert entries["C1"]["last_activity"] is None
+    assert entries["C1"]["inactive_seconds"] is None
+    assert entries["C4"]["reason"] == "inactive for 25 days"
+
+
+def test_warnings_are_applied_from_the_planned_channel_record(slack, housekeeper, tmp_path):
+    plan = Plan(planned_at=time.time())
+    # A warning without a last activity, e.g. from a policy that warns later than it archives
+    plan.add("warn", dict(slack.channels["C1"]), "inactive for more than 30 days")
+    plan.save(str(tmp_path / "plan.json"))
+    plan = Plan.load(str(tmp_path / "plan.json"))
+    assert plan.actions[0]["channel"]["created"] == slack.channels["C1"]["created"]
+
+    assert housekeeper.apply_plan(plan)["warn"] == 1
+    [message] = [message for message in slack.posted if message["channel"] == "U1"]
+    assert "#quiet: inactive for more than 30 days" in message["text"]
+
+
+def test_history_is_checked_back_to_the_later_threshold(slack, make_housekeeper):
+    # Warned later than archived: a channel quiet for 40 days is only past both after 45
+    policy = Policy({"defaults": {"warn_after": 45, "archive_after": 30}})
+    housekeeper = make_housekeeper(slack, scan_workers=1, policy=policy)
+    last_ts, quiet_since = housekeeper.get_last_activity(slack.channels["C1"])
+    assert quiet_since is None and last_ts == pytest.approx(float(slack.messages["C1"][-1]["ts"]))
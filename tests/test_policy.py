@@ -0,0 +1,80 @@
+"""Picking a channel's thresholds from a policy."""
+from datetime import timedelta
+
+import pytest
+
+from slack_housekeeper.policy import Policy, load_policy
+
+RULES = {
+    "defaults": {"warn_after": 21, "archive_after": 30},
+    "rule": [
+        {"name": "projects", "prefix": ["proj-", "#tmp-"], "archive_after": "14d"},
+        {"name": "proj-core", "prefix": "proj-core", "keep": True},
+        {"name": "shared", "type": "shared", "keep": True},
+        {"name": "big", "min_members": 100, "warn_after": 60, "archive_after": 90},
+        {"name": "tiny", "max_members": 2, "archive_after": "36h"},
+    ],
+}
+
+
+@pytest.fixture
+def policy():
+    return Policy(RULES)
+
+
+def rule(policy, name, kind="public", members=10):
+    return policy.thresholds_for(name, kind, members).rule
+
+
+def test_prefixes_match_the_start_of_the_name(policy):
+    assert rule(policy, "proj-apollo") == "projects"
+    assert rule(policy, "PROJ-Apollo") == "projects"
+    assert rule(policy, "tmp-scratch") == "projects"
+    assert rule(policy, "my-proj-apollo") == "defaults"
+    # The first rule wins, even when a later one has a longer prefix
+    assert rule(policy, "proj-core-infra") == "projects"
+    assert policy.thresholds_for("proj-apollo", "public", 10).archive_after == timedelta(days=14)
+
+
+def test_types_match(policy):
+    assert rule(policy, "partners", "shared") == "shared"
+    assert rule(policy, "partners", "private") == "defaults"
+    assert policy.thresholds({"name": "partners", "is_ext_shared": True, "num_members": 10}).keep
+
+
+def test_sizes_match_at_their_bounds(policy):
+    assert rule(policy, "general", members=99) == "defaults"
+    assert rule(policy, "general", members=100) == "big"
+    assert rule(policy, "general", members=2) == "tiny"
+    assert rule(policy, "general", members=3) == "defaults"
+    # Without a member count, no size rule applies
+    assert rule(policy, "general", members=None) == "defaults"
+
+
+def test_thresholds_are_cached_per_name_type_and_size_bucket(policy):
+    for members in (10, 20, 99):
+        assert rule(policy, "general", members=members) == "defaults"
+    assert len(policy._cache) == 1
+    # A size equal to a bound has a bucket of its own
+    assert rule(policy, "general", members=100) == "big"
+    assert rule(policy, "general", members=5000) == "big"
+    assert rule(policy, "general", members=6000) == "big"
+    assert rule(policy, "general", "private", members=10) == "defaults"
+    assert len(policy._cache) == 4
+
+
+def test_unknown_keys_are_rejected():
+    with pytest.raises(ValueError, match="archive_afer_days"):
+        Policy({"rule": [{"prefix": "proj-", "archive_afer_days": 14}]})
+    with pytest.raises(ValueError, match="warn_afer"):
+        Policy({"defaults": {"warn_afer": 21}})
+    with pytest.raises(ValueError, match="rules"):
+        Policy({"rules": []})
+
+
+def test_policy_files_are_read(tmp_path):
+    path = tmp_path / "policy.toml"
+    path.write_text('[defaults]\nwarn_after = "2d"\n\n[[rule]]\nprefix = "proj-"\nkeep = true\n')
+    policy = load_policy(str(path))
+    assert policy.defaults.warn_after == timedelta(days=2)
+    assert rule(policy, "proj-x") == "rule 1"
@@ -0,0 +1,101 @@
+"""RequestScheduler against a FakeSlack that answers 429, on a fake clock so nothing really sleeps."""
+import pytest
+
+from slack_housekeeper.api import ApiResponse, api_errors
+from slack_housekeeper.fakeslack import FakeSlack
+from slack_housekeeper.ratelimit import DEFAULT_RETRY_AFTER, RateLimitedClient, RequestScheduler, retry_after
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def slack():
+    slack = FakeSlack()
+    slack.add_channel("C1", "general", last_message_ts=1.0)
+    return slack
+
+
+def client_for(slack, clock, max_retries=5):
+    # Limits high enough that refilling the buckets never adds waits of its own
+    scheduler = RequestScheduler(max_retries=max_retries, scale=1000, clock=clock, sleep=clock.sleep)
+    return RateLimitedClient(slack, scheduler)
+
+
+def test_waits_for_retry_after_before_retrying(slack, clock):
+    slack.inject_ratelimit("conversations_history", times=2, retry_after=3)
+    client = client_for(slack, clock)
+
+    response = client.conversations_history(channel="C1", limit=1)
+
+    assert response["ok"]
+    assert slack.calls["conversations_history"] == 3
+    assert clock.sleeps == [3.0, 3.0]
+
+
+def test_pause_holds_back_other_calls_of_the_method(slack, clock):
+    slack.inject_ratelimit("conversations_history", times=1, retry_after=7)
+    client = client_for(slack, clock)
+
+    client.conversations_history(channel="C1", limit=1)
+    started = clock.now
+    client.conversations_history(channel="C1", limit=1)
+    # Other methods have buckets of their own and aren't paused
+    client.conversations_info(channel="C1")
+
+    assert clock.sleeps == [7.0]
+    assert clock.now - started < 1
+
+
+def test_retries_up_to_max_retries(slack, clock):
+    slack.inject_ratelimit("conversations_history", times=2, retry_after=1)
+    client = client_for(slack, clock, max_retries=2)
+
+    assert client.conversations_history(channel="C1", limit=1)["ok"]
+    assert slack.calls["conversations_history"] == 3
+
+
+def test_raises_once_retries_are_used_up(slack, clock):
+    slack.inject_ratelimit("conversations_history", times=5, retry_after=2)
+    client = client_for(slack, clock, max_retries=2)
+
+    with pytest.raises(api_errors()) as raised:
+        client.conversations_history(channel="C1", limit=1)
+
+    assert raised.value.response["error"] == "ratelimited"
+    assert raised.value.response.status_code == 429
+    assert slack.calls["conversations_history"] == 3
+    assert clock.sleeps == [2.0, 2.0]
+
+
+def test_other_errors_are_not_retried(slack, clock):
+    client = client_for(slack, clock)
+
+    with pytest.raises(api_errors()) as raised:
+        client.conversations_history(channel="C404", limit=1)
+
+    assert raised.value.response["error"] == "channel_not_found"
+    assert slack.calls["conversations_history"] == 1
+    assert clock.sleeps == []
+
+
+def test_retry_after_without_header():
+    response = ApiResponse({"ok": False, "error": "ratelimited"}, status_code=429)
+    error = api_errors()[0]("rate limited", response)
+
+    assert retry_after(error) == DEFAULT_RETRY_AFTER
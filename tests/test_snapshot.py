@@ -0,0 +1,74 @@
+"""Snapshots written by Housekeeper.run() against a FakeSlack, and the queries over them."""
+import time
+from datetime import timedelta
+
+import pytest
+
+from slack_housekeeper.fakeslack import FakeSlack
+from slack_housekeeper.snapshot import RunSnapshot, bucket_labels, histogram, load_snapshots, trending
+
+DAY = 86400
+
+
+@pytest.fixture
+def slack():
+    now = time.time()
+    slack = FakeSlack()
+    slack.add_channel("C1", "active", creator="U1", created=now - 100 * DAY, last_message_ts=now - DAY)
+    slack.add_channel("C2", "fading", creator="U1", created=now - 100 * DAY, last_message_ts=now - 26 * DAY)
+    slack.add_channel("C3", "gone-quiet", creator="U1", created=now - 100 * DAY, last_message_ts=now - 40 * DAY)
+    slack.add_user("U1")
+    return slack
+
+
+def sweep(make_housekeeper, slack, tmp_path, runs):
+    for _ in range(runs):
+        housekeeper = make_housekeeper(slack, run_interval=timedelta(0), snapshot_dir=str(tmp_path / "snapshots"))
+        try:
+            housekeeper.run()
+        finally:
+            housekeeper.close()
+
+
+def test_last_ts_is_the_real_last_message(slack, make_housekeeper, tmp_path):
+    pytest.importorskip("pyarrow")
+    sweep(make_housekeeper, slack, tmp_path, runs=3)
+
+    snapshots = load_snapshots(str(tmp_path / "snapshots"))
+    fading = [row for row in snapshots.to_pylist() if row["channel_id"] == "C2"]
+    assert {row["last_ts"] for row in fading} == {float(slack.messages["C2"][-1]["ts"])}
+    assert {row["decision"] for row in fading} == {"warn"}
+
+
+def test_trending_counts_the_snapshots_with_the_same_last_activity(slack, make_housekeeper, tmp_path):
+    pytest.importorskip("pyarrow")
+    sweep(make_housekeeper, slack, tmp_path, runs=3)
+
+    result = trending(load_snapshots(str(tmp_path / "snapshots")), days=7).to_pylist()
+
+    assert [(row["name"], row["quiet_snapshots"]) for row in result] == [("fading", 3)]
+
+
+def test_quiet_channels_have_no_last_ts(slack, make_housekeeper, tmp_path):
+    pytest.importorskip("pyarrow")
+    sweep(make_housekeeper, slack, tmp_path, runs=1)
+
+    snapshots = load_snapshots(str(tmp_path / "snapshots"))
+    quiet = [row for row in snapshots.to_pylist() if row["channel_id"] == "C3"]
+    assert [(row["decision"], row["last_ts"]) for row in quiet] == [("archive", None)]
+
+    header, rows = histogram(snapshots)
+    counts = {row[1]: dict(zip(header, row)) for row in rows}["gone"]
+    assert counts["past cutoff"] == 1
+    assert counts["unknown"] == 0
+    assert header[2:] == bucket_labels()
+
+
+def test_snapshots_taken_at_the_same_time_get_their_own_files(tmp_path):
+    taken_at = time.time()
+    paths = []
+    for _ in range(3):
+        snapshot = RunSnapshot(taken_at)
+        snapshot.add({"id": "C1", "name": "general", "created": taken_at}, "none")
+        paths.append(snapshot.save(str(tmp_path), "json"))
+    assert len(set(paths)) == 3
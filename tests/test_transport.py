@@ -0,0 +1,99 @@
+"""ConnectionPool's retry on stale keep-alive connections, against a bare socket server."""
+import socket
+import threading
+
+import pytest
+
+from slack_housekeeper.transport import ConnectionPool
+
+OK = b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 11\r\n\r\n{\"ok\":true}"
+
+
+class ScriptedServer:
+    """Answers the n-th request it reads with `actions[n]`: "ok", "ok_then_close" or "hang"."""
+
+    def __init__(self, actions):
+        self.actions = list(actions)
+        self.requests = 0
+        self.connections = 0
+        self.closed = threading.Event()
+        self._released = threading.Event()
+        self._sock = socket.create_server(("127.0.0.1", 0))
+        self.url = f"http://127.0.0.1:{self._sock.getsockname()[1]}/api/"
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _read_request(self, reader):
+        length = 0
+        line = reader.readline()
+        if not line:
+            return False
+        while line not in (b"\r\n", b""):
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+            line = reader.readline()
+        reader.read(length)
+        return True
+
+    def _serve(self, conn):
+        with conn, conn.makefile("rb") as reader:
+            while self._read_request(reader):
+                action = self.actions[self.requests]
+                self.requests += 1
+                if action == "hang":
+                    self._released.wait()
+                    return
+                conn.sendall(OK)
+                if action == "ok_then_close":
+                    break
+        self.closed.set()
+
+    def close(self):
+        self._released.set()
+        self._sock.close()
+
+
+@pytest.fixture
+def server_for():
+    servers = []
+
+    def start(*actions):
+        servers.append(ScriptedServer(actions))
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def test_replaces_a_connection_the_server_closed(server_for):
+    server = server_for("ok_then_close", "ok")
+    pool = ConnectionPool(server.url, size=1, timeout=5)
+
+    assert pool.request("POST", "/api/chat.postMessage", b"a=1")[0] == 200
+    server.closed.wait(5)
+    assert pool.request("POST", "/api/chat.postMessage", b"a=2")[0] == 200
+
+    assert server.requests == 2
+    assert pool.connections_opened == 2
+
+
+def test_timeout_after_sending_is_not_retried(server_for):
+    server = server_for("ok", "hang", "ok")
+    pool = ConnectionPool(server.url, size=1, timeout=0.3)
+
+    pool.request("POST", "/api/chat.postMessage", b"a=1")
+    with pytest.raises(TimeoutError):
+        pool.request("POST", "/api/chat.postMessage", b"a=2")
+
+    # The message may have been posted, it mustn't be sent again
+    assert server.requests == 2
+    assert pool.connections_opened == 1
@@ -0,0 +1,70 @@
+"""Who warnings go to when a channel's creator can't be sent a DM."""
+import time
+from datetime import timedelta
+
+import pytest
+
+from slack_housekeeper.fakeslack import FakeSlack
+from slack_housekeeper.users import UserDirectory
+
+
+@pytest.fixture
+def slack():
+    slack = FakeSlack(page_size=2)
+    slack.add_user("U1")
+    slack.add_user("U2", deleted=True)
+    slack.add_user("U3", is_bot=True)
+    slack.add_user("U4", is_restricted=True)
+    slack.add_user("USLACKBOT")
+    return slack
+
+
+def directory(slack, tmp_path, ttl=timedelta(hours=24)):
+    return UserDirectory(slack, str(tmp_path / "users.sqlite"), ttl=ttl)
+
+
+def test_deactivated_bots_and_guests_are_skipped(slack, tmp_path):
+    users = directory(slack, tmp_path)
+    assert users.recipient("U2", "U3", "U4", "USLACKBOT", "U1") == "U1"
+    assert users.recipient("U2", None, "U3") is None
+    # Users who joined after the snapshot was taken are assumed reachable
+    assert users.can_notify("U9")
+    # Listed page by page, once
+    assert slack.calls["users_list"] == 3
+    users.close()
+
+
+def test_the_snapshot_is_reused_until_it_expires(slack, tmp_path):
+    users = directory(slack, tmp_path)
+    users.recipient("U1")
+    users.close()
+    slack.add_user("U1", deleted=True)
+
+    users = directory(slack, tmp_path)
+    assert users.can_notify("U1")
+    assert slack.calls["users_list"] == 3
+    users.close()
+
+    users = directory(slack, tmp_path, ttl=timedelta(0))
+    assert not users.can_notify("U1")
+    assert slack.calls["users_list"] == 6
+    users.close()
+
+
+def test_no_users_list_without_a_lookup(slack, tmp_path):
+    directory(slack, tmp_path).close()
+    assert slack.calls["users_list"] == 0
+
+
+def test_warnings_for_a_deactivated_creator_go_to_the_fallback_admin(make_housekeeper):
+    slack = FakeSlack()
+    slack.add_channel("C1", "idle", creator="U2")
+    # The last message is from the creator too, so the admin is the one left
+    slack.add_message("C1", time.time() - 25 * 86400, user="U2")
+    slack.add_user("U2", deleted=True)
+    slack.add_user("UADMIN")
+
+    summary = make_housekeeper(slack, fallback_admin="UADMIN").run()
+
+    assert summary["warned"] == 1
+    assert [message["channel"] for message in slack.posted] == ["UADMIN"]
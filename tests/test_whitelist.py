@@ -0,0 +1,60 @@
+"""Whitelist rules and reloading."""
+import os
+
+import pytest
+
+from slack_housekeeper.whitelist import Whitelist
+
+RULES = """\
+# kept forever
+C01ABCDEF
+General
+proj-*
+re:^team-\\d+$
+re:[unclosed
+"""
+
+
+@pytest.fixture
+def whitelist(tmp_path):
+    path = tmp_path / "whitelist.txt"
+    path.write_text(RULES)
+    return Whitelist(str(path), check_interval=0)
+
+
+def matches(whitelist, name, channel_id="C999"):
+    return whitelist.matches({"id": channel_id, "name": name})
+
+
+def test_ids_and_names_match_exactly(whitelist):
+    assert matches(whitelist, "anything", channel_id="C01ABCDEF")
+    assert matches(whitelist, "general")
+    assert matches(whitelist, "GENERAL")
+    assert not matches(whitelist, "general-chat")
+
+
+def test_prefixes_and_patterns(whitelist):
+    assert matches(whitelist, "proj-apollo")
+    assert matches(whitelist, "Proj-")
+    assert not matches(whitelist, "my-proj-apollo")
+    assert matches(whitelist, "team-42")
+    assert not matches(whitelist, "team-42-alumni")
+
+
+def test_invalid_patterns_are_skipped(whitelist):
+    # "[unclosed" is logged and ignored, the other rules still apply
+    assert not matches(whitelist, "[unclosed")
+    assert matches(whitelist, "team-7")
+
+
+def test_edits_are_picked_up(whitelist, tmp_path):
+    path = tmp_path / "whitelist.txt"
+    path.write_text("random\n")
+    # Make sure the change is seen even on filesystems with coarse timestamps
+    os.utime(path, ns=(0, 0))
+    assert matches(whitelist, "random")
+    assert not matches(whitelist, "general")
+
+
+def test_a_missing_file_is_an_empty_whitelist(tmp_path):
+    assert not Whitelist(str(tmp_path / "missing.txt")).matches({"id": "C1", "name": "general"})